@@ -5,8 +5,11 @@
 ##############################################################################################################
 from datetime import UTC, datetime
 from enum import Enum, StrEnum, auto
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
-from azure.storage.blob import StandardBlobTier
+if TYPE_CHECKING:
+    from azure.storage.blob import StandardBlobTier
 
 
 ##############################################################################################################
@@ -28,16 +31,16 @@ class RECORD_ID(StrEnum):
     TAGS = "tags"  # Not used programmatically, but helpful for users
 
 
-REQD_RECORD_ID_FIELDS = [
+REQD_RECORD_ID_FIELDS = (
     RECORD_ID.VERSION.value,
     RECORD_ID.DATA_TYPE_ID.value,
     RECORD_ID.DEVICE_ID.value,
     RECORD_ID.SENSOR_INDEX.value,
     RECORD_ID.STREAM_INDEX.value,
     RECORD_ID.TIMESTAMP.value,
-]
+)
 
-ALL_RECORD_ID_FIELDS = [
+ALL_RECORD_ID_FIELDS = (
     *REQD_RECORD_ID_FIELDS,
     RECORD_ID.END_TIME.value,
     RECORD_ID.OFFSET.value,
@@ -46,7 +49,11 @@ ALL_RECORD_ID_FIELDS = [
     RECORD_ID.INCREMENT.value,
     RECORD_ID.NAME.value,
     RECORD_ID.TAGS.value,
-]
+)
+
+# Set variants for membership tests; the tuples above define the column order.
+REQD_RECORD_ID_FIELDS_SET = frozenset(REQD_RECORD_ID_FIELDS)
+ALL_RECORD_ID_FIELDS_SET = frozenset(ALL_RECORD_ID_FIELDS)
 
 
 ##############################################################################################################
@@ -65,11 +72,21 @@ class OVERRIDE(StrEnum):
 # https://learn.microsoft.com/en-us/azure/storage/blobs/storage-blob-storage-tiers
 ##############################################################################################################
 class StorageTier(Enum):
-    """Enum for the supported blob tiers."""
+    """Enum for the supported blob tiers.
+
+    Values are the Azure StandardBlobTier values; use blob_tier to get the SDK enum. The azure SDK is only
+    imported when that's needed, so that importing the API doesn't pull it in.
+    """
+
+    HOT = "Hot"
+    COOL = "Cool"
+    COLD = "Archive"
+
+    @property
+    def blob_tier(self) -> "StandardBlobTier":
+        from azure.storage.blob import StandardBlobTier
 
-    HOT = StandardBlobTier.HOT
-    COOL = StandardBlobTier.COOL
-    COLD = StandardBlobTier.ARCHIVE
+        return StandardBlobTier(self.value)
 
 
 ##############################################################################################################
@@ -187,10 +204,30 @@ def utc_to_fname_str(t: datetime | float | None = None) -> str:
     return timestamp[:-3]
 
 
+# Parsing is pure and datetimes are immutable, so cache results: file listings repeatedly parse the same
+# timestamps.
+@lru_cache(maxsize=4096)
 def utc_from_str(t: str) -> datetime:
     """Convert a string timestamp formatted according to a datetime object."""
     # strptime doesn't support just milliseconds, so pad the string with 3 zeros
-    t += "0" * (PADDED_TIME_LEN - len(t))
+    t = t.ljust(PADDED_TIME_LEN, "0")
+    # Fast path: the padded format has fixed field offsets, so slice out the integers directly rather than
+    # going through strptime's regex matching. Anything unexpected falls through to strptime, which does
+    # the validation and raises the usual ValueError.
+    if len(t) == PADDED_TIME_LEN and t[8] == "T" and t[:8].isdigit() and t[9:].isdigit():
+        try:
+            return datetime(
+                int(t[0:4]),
+                int(t[4:6]),
+                int(t[6:8]),
+                int(t[9:11]),
+                int(t[11:13]),
+                int(t[13:15]),
+                int(t[15:21]),
+                tzinfo=UTC,
+            )
+        except ValueError:
+            pass
     return datetime.strptime(t, STRFTIME).replace(tzinfo=UTC)
 
 
@@ -1,12 +1,16 @@
 import contextlib
+import heapq
+import os
+import random
 import shutil
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+from itertools import count, islice
 from pathlib import Path
-from queue import Empty, Queue
+from queue import Empty, SimpleQueue
 from threading import Event, Lock, Thread
-from time import perf_counter, sleep
+from time import monotonic, perf_counter
 
 import psutil
 
@@ -23,8 +27,13 @@ logger = root_cfg.setup_logger("expidite")
 
 # When both the network attempt and the spool write fail (doubly-degraded device: no connectivity AND an
 # unwritable spool disk), the item is re-queued for another cycle; this delay stops that cycle from
-# spinning hot (a DNS failure can return in milliseconds).
+# spinning hot (a DNS failure can return in milliseconds). It doubles on each consecutive fallback of the
+# same item up to the cap, with jitter so items that failed together don't retry in lockstep.
 _SPOOL_FALLBACK_BACKOFF_SECONDS = 10.0
+_SPOOL_FALLBACK_MAX_BACKOFF_SECONDS = 300.0
+
+# Upper bound on the data coalesced into one queued append; an Azure append_block takes at most 4 MiB.
+_MAX_COALESCED_APPEND_CHARS = 3 * 1024 * 1024
 
 # A spooled item that fails this many drain attempts with a non-transient error is quarantined so it
 # cannot block the items spooled behind it forever (e.g. a destination append blob at Azure's block limit).
@@ -63,6 +72,9 @@ class AsyncUpload:
     # (or spooling is otherwise triggered by memory pressure/shutdown) the data is simply dropped. Used
     # for recordings the caller has declared expendable, so they never consume scarce spool disk.
     can_discard: bool = False
+    # Doubly-degraded fallback state: do_work holds the item back until monotonic() reaches not_before.
+    fallbacks: int = 0
+    not_before: float = 0.0
 
 
 # eq=False: actions are tracked by identity in the in-flight set, so they must hash by identity.
@@ -75,6 +87,9 @@ class AsyncAppend:
     delete_src: bool
     data: list[str]
     col_order: list[str] | None = None
+    # Doubly-degraded fallback state: do_work holds the item back until monotonic() reaches not_before.
+    fallbacks: int = 0
+    not_before: float = 0.0
 
 
 class _DrainOutcome(Enum):
@@ -86,10 +101,22 @@ class _DrainOutcome(Enum):
 class AsyncCloudConnector(CloudConnector):
     def __init__(self) -> None:
         logger.debug("Creating AsyncCloudConnector instance")
-        super().__init__()
+        # Upload concurrency is set by cc_upload_pool_size alone: every batch already runs on one of that
+        # pool's workers, so the base class uploads its files in turn rather than each worker starting a
+        # thread pool of its own.
+        super().__init__(upload_workers=1)
         self._stop_requested = Event()
-        self._upload_queue: Queue[AsyncAppend | AsyncUpload | None] = Queue()
-        self._worker_pool: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=6)
+        # do_work is the only consumer and nothing joins on the queue, so a SimpleQueue suffices: no task_done
+        # accounting and a C-level put/get.
+        self._upload_queue: SimpleQueue[AsyncAppend | AsyncUpload | None] = SimpleQueue()
+        # Pool sizes come from DeviceCfg. do_work runs on its own dispatcher thread, so every pool slot is
+        # available for uploads.
+        self._worker_pool: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=root_cfg.my_device.cc_upload_pool_size
+        )
+        self._append_pool: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=root_cfg.my_device.cc_append_pool_size
+        )
         self._perf_lock = Lock()
         self._perf_report_interval_seconds = 15 * 60
         self._perf_last_report_time = perf_counter()
@@ -109,10 +136,15 @@ class AsyncCloudConnector(CloudConnector):
         # Queue items currently being processed by a worker thread; used at shutdown to safety-copy their
         # data to the spool in case the process is killed mid-upload.
         self._in_flight: set[AsyncAppend | AsyncUpload] = set()
+        # Appends still waiting on the queue, by destination blob, with the size of their data. A further
+        # append to the same blob is merged into the waiting item rather than queued as another request.
+        self._pending_appends: dict[tuple[str, str], tuple[AsyncAppend, int]] = {}
         # Per-item drain failure counts (drain thread only; no lock needed) driving quarantine.
         self._drain_failures: dict[Path, int] = {}
-        # Start the worker thread to process the upload queue
-        self._worker_pool.submit(self.do_work)
+        # Start the dispatcher thread to process the upload queue. Daemon for the same reason as the drain
+        # thread below; shutdown() wakes it with the queue sentinel.
+        self._dispatcher_thread = Thread(target=self.do_work, name="upload_dispatcher", daemon=True)
+        self._dispatcher_thread.start()
         # Start the spool drain thread. Daemon so a drain stuck in a long network timeout can never block
         # process exit. Woken immediately if a previous run left data in the spool (e.g. across a reboot).
         self._drain_wake = Event()
@@ -148,17 +180,19 @@ class AsyncCloudConnector(CloudConnector):
             self._spool_action(action, safety_copy=True)
 
         self._worker_pool.shutdown(wait=False, cancel_futures=True)
+        self._append_pool.shutdown(wait=False, cancel_futures=True)
         # cancel_futures may have cancelled a hand-off before its worker ran, so that item's _async_* never
         # executed and never spooled it - yet it is still in _in_flight (only _finish_in_flight removes it).
         # Re-persist whatever remains: for an upload still running this is an idempotent re-copy (same FAIR
         # name) of what the pass above already safety-copied; for a cancelled hand-off it is the only thing
-        # between the data and loss. Done AFTER the pool has stopped, so do_work can no longer add new
+        # between the data and loss. Done AFTER the pools have stopped, so do_work can no longer add new
         # entries (its post-stop submits are re-checked and self-spooled - see do_work).
         with self._state_lock:
             stranded = list(self._in_flight)
         for action in stranded:
             self._spool_action(action, safety_copy=True)
 
+        self._dispatcher_thread.join(timeout=5)
         self._drain_thread.join(timeout=5)
 
         self._log_async_performance(force=True)
@@ -182,25 +216,33 @@ class AsyncCloudConnector(CloudConnector):
         than persisted to the disk spool (see _spool_action), so declared-expendable recordings never take
         up scarce spool disk during an outage.
         """
-        verified_files = []
-        for file in src_files:
-            if not file.exists():
-                logger.error(f"{root_cfg.RAISE_WARN()}Upload of file {file} aborted; does not exist")
-            else:
-                verified_files.append(file)
-
-        src_files = verified_files
-
+        verified_files: list[Path] = []
         if delete_src:
-            # Rename the files so that they are effectively deleted from the callers perspective
-            # We delete this temporary directory in _async_upload() after the upload is complete
+            # Move the files into a temporary directory so that they are effectively deleted from the caller's
+            # perspective. The move doubles as the existence check; _async_upload() removes the directory
+            # once the upload is complete.
             tmp_dir = file_naming.get_temporary_dir()
-            for i, file in enumerate(src_files):
-                # Move the files to the tmp_dir
+            missing: list[Path] = []
+            for file in src_files:
                 tmp_file = tmp_dir / file.name
-                shutil.move(file, tmp_file)
-                src_files[i] = tmp_file
+                try:
+                    shutil.move(file, tmp_file)
+                except FileNotFoundError:
+                    missing.append(file)
+                    continue
+                verified_files.append(tmp_file)
+            for file in missing:
+                logger.error(f"{root_cfg.RAISE_WARN()}Upload of file {file} aborted; does not exist")
+            if not verified_files:
+                tmp_dir.rmdir()
+        else:
+            for file in src_files:
+                if not file.exists():
+                    logger.error(f"{root_cfg.RAISE_WARN()}Upload of file {file} aborted; does not exist")
+                else:
+                    verified_files.append(file)
 
+        src_files = verified_files
         if src_files:
             self._upload_queue.put(
                 AsyncUpload(dst_container, src_files, delete_src, storage_tier, can_discard)
@@ -212,24 +254,41 @@ class AsyncCloudConnector(CloudConnector):
         """Async version of append_to_cloud."""
         logger.debug(f"AsyncCC.append_to_cloud() with delete_src={delete_src} for {src_file}")
 
-        if not src_file.exists():
+        # Read the local file data ready to append; the open doubles as the existence check.
+        data: list[str] | None = None
+        with contextlib.suppress(FileNotFoundError), src_file.open("r") as file:
+            header = file.readline()
+            if os.fstat(file.fileno()).st_size == len(header.encode()):
+                return False  # No data beyond headers; skip reading the rest of the file
+            data = [header, *file.readlines()]
+        if data is None:
             logger.error(f"{root_cfg.RAISE_WARN()}Upload failed because file {src_file} does not exist")
             return False
-
-        # Read the local file data ready to append
-        data: list[str] = []
-        with src_file.open("r") as file:
-            data = file.readlines()
-            if len(data) == 1:
-                return False  # No data beyond headers
+        if len(data) <= 1:
+            return False  # No data beyond headers
 
         if delete_src:
             # Although this is asynchronous, we need to appear to delete the src_files synchronously
             src_file.unlink()
 
-        self._upload_queue.put(
-            AsyncAppend(dst_container, src_file.name, delete_src, data=data, col_order=col_order)
-        )
+        key = (dst_container, src_file.name)
+        size = sum(len(line) for line in data)
+        with self._state_lock:
+            pending = self._pending_appends.get(key)
+            if (
+                pending is not None
+                and pending[0].data[0] == data[0]
+                and pending[0].col_order == col_order
+                and pending[1] + size <= _MAX_COALESCED_APPEND_CHARS
+            ):
+                # Same blob, headers and column order, and not yet picked up: add our rows to the waiting
+                # append. Merging here, at enqueue time, means do_work never has to search the queue.
+                pending[0].data.extend(islice(data, 1, None))
+                self._pending_appends[key] = (pending[0], pending[1] + size)
+                return True
+            action = AsyncAppend(dst_container, src_file.name, delete_src, data=data, col_order=col_order)
+            self._pending_appends[key] = (action, size)
+        self._upload_queue.put(action)
 
         return True
 
@@ -299,6 +358,15 @@ class AsyncCloudConnector(CloudConnector):
             logger.info("Cloud connectivity restored; leaving offline mode")
             self._drain_wake.set()
 
+    def _claim_queue_item(self, queue_item: AsyncAppend | AsyncUpload) -> None:
+        """Stop further appends being merged into an item that has been taken off the queue."""
+        if isinstance(queue_item, AsyncAppend):
+            with self._state_lock:
+                key = (queue_item.dst_container, queue_item.src_fname)
+                pending = self._pending_appends.get(key)
+                if pending is not None and pending[0] is queue_item:
+                    del self._pending_appends[key]
+
     def _spill_queue_to_spool(self) -> None:
         """Move everything on the in-memory upload queue to the disk spool. Shutdown path; no network I/O."""
         spilled = 0
@@ -311,10 +379,10 @@ class AsyncCloudConnector(CloudConnector):
                 # do_work's wake-up sentinel; put it back rather than swallowing it.
                 self._upload_queue.put(None)
                 break
+            self._claim_queue_item(queue_item)
             if not self._spool_action(queue_item):
                 # Spool disk full/unwritable at shutdown: there is no retry path left.
                 logger.error(f"{root_cfg.RAISE_WARN()}Spool unavailable at shutdown; data lost: {queue_item}")
-            self._upload_queue.task_done()
             spilled += 1
         if spilled:
             logger.info(f"Spilled {spilled} queued uploads to disk spool at {self._spool.root}")
@@ -510,12 +578,16 @@ class AsyncCloudConnector(CloudConnector):
             )
             self._note_cloud_success()
             if action.delete_src:
-                # We created a temporary directory for the files in upload_to_container - delete it now
+                # We created a temporary directory for the files in upload_to_container. The upload has
+                # already unlinked each file, so the directory should be empty and a single rmdir removes it.
                 tmp_dir = action.src_files[0].parent
-                if tmp_dir.exists() and tmp_dir.is_dir():
-                    shutil.rmtree(tmp_dir)
-                else:
+                if not tmp_dir.is_dir():
                     logger.error(f"{root_cfg.RAISE_WARN()}Temporary directory {tmp_dir} does not exist")
+                else:
+                    try:
+                        tmp_dir.rmdir()
+                    except OSError:
+                        shutil.rmtree(tmp_dir, ignore_errors=True)
         except Exception as e:
             self._note_cloud_failure(e)
             disposition = "discarding (expendable)" if action.can_discard else "diverting to disk spool"
@@ -525,8 +597,7 @@ class AsyncCloudConnector(CloudConnector):
             if action.src_files and not self._spool_action(action) and not self._stop_requested.is_set():
                 # Doubly-degraded (network AND spool disk failed): keep the data in RAM and try the whole
                 # cycle again later rather than lose it.
-                self._upload_queue.put(action)
-                sleep(_SPOOL_FALLBACK_BACKOFF_SECONDS)
+                self._requeue_after_backoff(action)
         finally:
             self._finish_in_flight(action)
             self._record_async_timing("upload", perf_counter() - start_time)
@@ -559,11 +630,23 @@ class AsyncCloudConnector(CloudConnector):
             if not succeeded and not self._spool_action(action) and not self._stop_requested.is_set():
                 # Doubly-degraded (network AND spool disk failed): keep the data in RAM and try the whole
                 # cycle again later rather than lose it.
-                self._upload_queue.put(action)
-                sleep(_SPOOL_FALLBACK_BACKOFF_SECONDS)
+                self._requeue_after_backoff(action)
             self._finish_in_flight(action)
             self._record_async_timing("append", perf_counter() - start_time)
 
+    def _requeue_after_backoff(self, action: AsyncAppend | AsyncUpload) -> None:
+        """Put a doubly-degraded item back on the queue, due after a capped exponential backoff.
+
+        The worker returns straight away; do_work holds the item until it is due, so a backing-off item
+        never occupies a pool thread.
+        """
+        backoff = min(
+            _SPOOL_FALLBACK_MAX_BACKOFF_SECONDS, _SPOOL_FALLBACK_BACKOFF_SECONDS * 2**action.fallbacks
+        )
+        action.fallbacks += 1
+        action.not_before = monotonic() + backoff * random.uniform(0.5, 1.5)
+        self._upload_queue.put(action)
+
     def _finish_in_flight(self, action: AsyncAppend | AsyncUpload) -> None:
         with self._state_lock:
             self._in_flight.discard(action)
@@ -613,21 +696,38 @@ class AsyncCloudConnector(CloudConnector):
 
     def do_work(self) -> None:
         """Process the upload queue: hand each item to the worker pool for its single network attempt."""
+        # Items re-queued after a doubly-degraded failure that are not yet due, ordered by not_before. Only
+        # this thread touches the heap; the counter breaks ties so actions themselves are never compared.
+        deferred: list[tuple[float, int, AsyncAppend | AsyncUpload]] = []
+        tiebreak = count()
+        queue_item: AsyncAppend | AsyncUpload | None  # None is the shutdown sentinel
         while not self._stop_requested.is_set():
             try:
-                queue_item = self._upload_queue.get()
+                if deferred and deferred[0][0] <= monotonic():
+                    queue_item = heapq.heappop(deferred)[2]
+                else:
+                    try:
+                        queue_item = self._upload_queue.get(
+                            timeout=max(0.0, deferred[0][0] - monotonic()) if deferred else None
+                        )
+                    except Empty:
+                        continue  # The earliest deferred item is now due
 
                 if queue_item is None:
                     # Shutdown sentinel.
                     logger.debug("Upload queue flushed")
-                    self._upload_queue.task_done()
                     break
 
+                self._claim_queue_item(queue_item)
+
+                if queue_item.not_before > monotonic() and not self._stop_requested.is_set():
+                    heapq.heappush(deferred, (queue_item.not_before, next(tiebreak), queue_item))
+                    continue
+
                 if self._stop_requested.is_set():
                     # Shutdown is spilling the queue; spool anything we dequeued ourselves so nothing is
                     # stranded between the queue and the worker pool.
                     self._spool_action(queue_item)
-                    self._upload_queue.task_done()
                     continue
 
                 if self._memory_pressure():
@@ -635,7 +735,6 @@ class AsyncCloudConnector(CloudConnector):
                     # backs up; the tmpfs working dir also counts). Send this item straight to disk. If the
                     # spool can't take it, fall through to a normal attempt (uploading also frees memory).
                     if self._spool_action(queue_item):
-                        self._upload_queue.task_done()
                         continue
 
                 # Register as in-flight, then hand off for the single network attempt. A shutdown() racing
@@ -650,7 +749,7 @@ class AsyncCloudConnector(CloudConnector):
                 if not self._stop_requested.is_set():
                     try:
                         if isinstance(queue_item, AsyncAppend):
-                            self._worker_pool.submit(self._async_append, queue_item)
+                            self._append_pool.submit(self._async_append, queue_item)
                         else:
                             self._worker_pool.submit(self._async_upload, queue_item)
                         submitted = True
@@ -660,10 +759,11 @@ class AsyncCloudConnector(CloudConnector):
                 if not submitted:
                     self._spool_action(queue_item)
                     self._finish_in_flight(queue_item)
-
-                # Mark the task as done, in the sense that we've scheduled it for processing
-                self._upload_queue.task_done()
             except Exception:
                 logger.exception(f"{root_cfg.RAISE_WARN()}Error during do_work execution")
 
+        # Shutdown: items still backing off are not on the queue for shutdown() to spill, so spool them here.
+        for _, _, queue_item in deferred:
+            if not self._spool_action(queue_item):
+                logger.error(f"{root_cfg.RAISE_WARN()}Spool unavailable at shutdown; data lost: {queue_item}")
         logger.info("do_work completed")
@@ -1,21 +1,26 @@
 import contextlib
 import csv
 import io
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import UTC, datetime, timedelta
+from itertools import islice
 from pathlib import Path
-from threading import Lock
-from typing import Optional
+from threading import BoundedSemaphore, Lock
+from time import monotonic, sleep
+from typing import ClassVar
 
-import pandas as pd
 from azure.core.exceptions import (
+    HttpResponseError,
     ResourceExistsError,
     ResourceModifiedError,
     ResourceNotFoundError,
     ServiceRequestError,
     ServiceResponseError,
 )
-from azure.storage.blob import BlobClient, ContainerClient
+from azure.storage.blob import BlobClient, BlobServiceClient, ContainerClient
 
 from expidite_rpi.core import api, file_naming
 from expidite_rpi.core import configuration as root_cfg
@@ -78,6 +83,26 @@ def log_cloud_failure(message: str, exc: Exception, *, elapsed_seconds: float =
     logger.warning("Stack trace follows for debugging", exc_info=exc)
 
 
+# Header row last validated against each remote append blob, keyed by "<container>/<blob>". Persisted so that
+# a restart doesn't have to download the head of every blob again to re-check headers it already checked.
+_HEADER_CACHE_FILE = root_cfg.ROOT_WORKING_DIR / "append_headers.json"
+# Most blobs are date-named, so a new key appears every day. Only the most recently validated entries are
+# kept; an evicted blob that is still being written just has its header re-checked once.
+_HEADER_CACHE_MAX_ENTRIES = 200
+
+# How much of a remote append blob to read when checking its header row.
+_HEADER_PEEK_BYTES = 1000
+
+# How long move_between_containers waits for a server-side copy to leave the "pending" state before aborting
+# it. A copy between containers in the same account normally completes in well under a second.
+_COPY_TIMEOUT_SECONDS = 300
+
+# Attempts per file in a batch download before a transient network failure fails the batch.
+_DOWNLOAD_ATTEMPTS = 3
+
+# Maximum number of downloads submitted to the thread pool but not yet finished.
+_MAX_PENDING_DOWNLOADS = 32
+
 # Chunk size for delta (append-only) downloads. Each chunk is fetched as a single ranged GET, which keeps
 # the Azure SDK from issuing follow-up requests that carry an If-Match condition - and it is that condition
 # that aborts a download when the blob is appended to mid-transfer. Must stay at or below the SDK's
@@ -85,55 +110,99 @@ def log_cloud_failure(message: str, exc: Exception, *, elapsed_seconds: float =
 _DELTA_CHUNK_BYTES = 8 * 1024 * 1024
 
 
+def _split_header(line: str) -> list[str]:
+    """Split a CSV header row into column names.
+
+    Our headers are machine-generated and rarely quoted, so a plain split is enough unless there's a quote.
+    """
+    if '"' in line:
+        return next(csv.reader([line]))
+    return line.rstrip("\r\n").split(",")
+
+
+def _project_rows(
+    reader: Iterator[list[str]], header: list[str], fieldnames: list[str]
+) -> Iterator[list[str]]:
+    """Yield the rows of a csv.reader rearranged from header order into fieldnames order.
+
+    Columns missing from header are written empty, as csv.DictWriter would; blank lines are skipped and
+    short or long rows are padded or truncated, as csv.DictReader would.
+    """
+    width = len(header)
+    positions = {name: i for i, name in enumerate(header)}
+    # Columns absent from header read index `width`, an empty slot appended to every row.
+    indices = [positions.get(name, width) for name in fieldnames]
+    for row in reader:
+        if not row:
+            continue
+        padded = row if len(row) == width else (row + [""] * width)[:width]
+        padded.append("")
+        yield [padded[i] for i in indices]
+
+
+def _truncate_partial_download(dst_file: Path, offset: int) -> None:
+    """Cut dst_file back to offset bytes if a failed delta download left it longer."""
+    with contextlib.suppress(FileNotFoundError):
+        if dst_file.stat().st_size > offset:
+            os.truncate(dst_file, offset)
+
+
 ##############################################################################################################
 # Default implementation of the CloudConnector class and interface definition.
 #
 # This class is used to connect to the cloud storage provider (Azure Blob Storage) but does so synchronously.
 ##############################################################################################################
 class CloudConnector:
-    _instance: Optional["CloudConnector"] = None
+    # One instance per CloudType, so that code using different types doesn't keep tearing the others down.
+    _instances: ClassVar[dict[CloudType, "CloudConnector"]] = {}
+    # Built on first use by get_instance (the subclasses can't be imported at module load).
+    _connector_map: ClassVar[dict[CloudType, type["CloudConnector"]]] = {}
 
-    def __init__(self) -> None:
+    def __init__(self, upload_workers: int = 8, transfer_concurrency: int = 8) -> None:
         if root_cfg.keys is None or root_cfg.keys.cloud_storage_key == root_cfg.FAILED_TO_LOAD:
             msg = "Cloud storage credentials not set; cannot connect to cloud"
             raise ValueError(msg)
 
         self._connection_string = root_cfg.keys.cloud_storage_key
+        # One service client per connection string; the container clients derived from it share its HTTP
+        # connection pool rather than each building a pipeline of their own.
+        self._service_client: BlobServiceClient | None = None
         self._validated_containers: dict[str, ContainerClient] = {}
         self._append_locks: dict[str, Lock] = {}
         self._append_locks_lock = Lock()
         self._validated_append_files: set[str] = set()
+        self._header_cache: dict[str, str] = self._load_header_cache()
+        # Number of threads upload_to_container uses to overlap the network latency of a multi-file batch.
+        self._upload_workers = upload_workers
+        # Number of parallel connections the Azure SDK uses to transfer the blocks of a single large blob.
+        self._transfer_concurrency = transfer_concurrency
 
     @staticmethod
     def get_instance(cloud_type: CloudType) -> "CloudConnector":
         """We use a factory pattern to offer up alternative types of CloudConnector for accessing different
         cloud storage providers and / or the local emulator.
         """
-        from expidite_rpi.core.cloud_connector.async_cloud_connector import AsyncCloudConnector
-        from expidite_rpi.core.cloud_connector.local_cloud_connector import LocalCloudConnector
-        from expidite_rpi.core.cloud_connector.sync_cloud_connector import SyncCloudConnector
-
-        connector_map: dict[CloudType, type[CloudConnector]] = {
-            CloudType.AZURE: AsyncCloudConnector,
-            CloudType.LOCAL_EMULATOR: LocalCloudConnector,
-            CloudType.SYNC_AZURE: SyncCloudConnector,
-        }
-        desired_class = connector_map[cloud_type]
-
-        if not isinstance(CloudConnector._instance, desired_class):
-            if CloudConnector._instance is not None:
-                logger.warning(
-                    f"{root_cfg.RAISE_WARN()}Replacing CloudConnector instance with {desired_class.__name__}"
-                )
-                CloudConnector.shutdown_instance()
-            CloudConnector._instance = desired_class()
-        return CloudConnector._instance
+        if not CloudConnector._connector_map:
+            from expidite_rpi.core.cloud_connector.async_cloud_connector import AsyncCloudConnector
+            from expidite_rpi.core.cloud_connector.local_cloud_connector import LocalCloudConnector
+            from expidite_rpi.core.cloud_connector.sync_cloud_connector import SyncCloudConnector
+
+            CloudConnector._connector_map = {
+                CloudType.AZURE: AsyncCloudConnector,
+                CloudType.LOCAL_EMULATOR: LocalCloudConnector,
+                CloudType.SYNC_AZURE: SyncCloudConnector,
+            }
+        instance = CloudConnector._instances.get(cloud_type)
+        if instance is None:
+            instance = CloudConnector._connector_map[cloud_type]()
+            CloudConnector._instances[cloud_type] = instance
+        return instance
 
     @staticmethod
     def shutdown_instance() -> None:
-        """Shut down the CloudConnector singleton if one exists."""
-        if CloudConnector._instance is not None:
-            CloudConnector._instance.shutdown()
+        """Shut down all CloudConnector instances."""
+        for instance in list(CloudConnector._instances.values()):
+            instance.shutdown()
 
     def set_keys(self, keys_file: Path | None = None, key: str | None = None) -> None:
         """Sets the cloud storage key for the CloudConnector from either a file or directly from a string."""
@@ -152,6 +221,7 @@ class CloudConnector:
         else:
             assert key is not None
             self._connection_string = key
+        self._service_client = None
 
     def upload_to_container(
         self,
@@ -172,26 +242,50 @@ class CloudConnector:
             can_discard: only meaningful for the AsyncCloudConnector - see its override. The synchronous base
                 connector has no disk spool, so it ignores this flag (a failed upload raises either way).
 
-        If the upload fails part way through, those files that were successfully uploaded will have been
-        deleted (if delete_src=True), while any remaining files in src_files will not have been deleted.
+        Files are uploaded in parallel. A failed file does not stop the rest of the batch; once all files
+        have been attempted, the first failure is re-raised. Those files that were successfully uploaded
+        will have been deleted (if delete_src=True), while the failed files will not have been deleted.
         """
         upload_container = self._validate_container(dst_container)
 
-        for file in src_files:
-            if file.exists():
-                blob_client = upload_container.get_blob_client(file.name)
-                with open(file, "rb") as data:
-                    blob_client.upload_blob(
-                        data,
-                        overwrite=True,
-                        connection_timeout=600,
-                        standard_blob_tier=storage_tier.value,
-                    )
-                if delete_src:
-                    logger.debug(f"Deleting uploaded file: {file}")
-                    file.unlink()
-            else:
+        def _upload_one(file: Path) -> None:
+            if not file.exists():
                 logger.error(f"{root_cfg.RAISE_WARN()}Upload failed because file {file} does not exist")
+                return
+            blob_client = upload_container.get_blob_client(file.name)
+            with open(file, "rb") as data:
+                blob_client.upload_blob(
+                    data,
+                    overwrite=True,
+                    connection_timeout=600,
+                    standard_blob_tier=storage_tier.blob_tier,
+                    max_concurrency=self._transfer_concurrency,
+                )
+            if delete_src:
+                logger.debug(f"Deleting uploaded file: {file}")
+                file.unlink()
+
+        # Most calls upload a single file, and AsyncCloudConnector runs with one worker; don't pay for a
+        # thread pool in either case.
+        if len(src_files) <= 1 or self._upload_workers <= 1:
+            for file in src_files:
+                _upload_one(file)
+            return
+
+        failed: list[Path] = []
+        first_exc: Exception | None = None
+        with ThreadPoolExecutor(max_workers=min(self._upload_workers, len(src_files))) as executor:
+            futures = {executor.submit(_upload_one, file): file for file in src_files}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    failed.append(futures[future])
+                    first_exc = first_exc or e
+
+        if first_exc is not None:
+            logger.warning(f"Failed to upload {len(failed)} of {len(src_files)} files: {failed}")
+            raise first_exc
 
     def download_from_container(self, src_container: str, src_file: str, dst_file: Path) -> None:
         """Downloads the src_datafile to a local dst_file Path."""
@@ -230,31 +324,21 @@ class CloudConnector:
                         dst_dir.mkdir(parents=True, exist_ok=True)
                 self._download_blob(blob_client, dst_dir / blob.name)
         else:
-            files_downloaded = 0
-            # Create a pool of threads to download the files
-            with ThreadPoolExecutor(max_workers=8) as executor:
-                futures = []
+
+            def _jobs() -> Iterator[tuple[BlobClient, Path, int, bool]]:
                 for blob_name in files:
-                    blob_client = download_container.get_blob_client(blob_name)
+                    dst_subdir = dst_dir
                     if folder_prefix_len is not None:
-                        dst_dir = original_dst_dir / blob_name[:folder_prefix_len]
-                    dst_file = dst_dir / blob_name
+                        dst_subdir = original_dst_dir / blob_name[:folder_prefix_len]
+                    dst_file = dst_subdir / blob_name
                     if not overwrite and dst_file.exists():
                         logger.debug(f"File {dst_file} already exists; skipping download")
                         continue
-                    futures.append(executor.submit(self._download_file, blob_client, dst_file))
-                    if len(futures) > 10_000:
-                        logger.info("Working on batch of 10,000 files")
-                        for future in as_completed(futures, timeout=600):
-                            future.result()
-                            files_downloaded += 1
-                        futures = []
-                logger.info(f"Downloading total of {len(futures)} files")
-
-                for future in as_completed(futures, timeout=600):
-                    future.result()
-                    files_downloaded += 1
-                logger.info(f"Completed downloaded of {files_downloaded} files")
+                    yield download_container.get_blob_client(blob_name), dst_file, 0, False
+
+            logger.info(f"Downloading up to {len(files)} files")
+            files_downloaded = self._download_files(_jobs())
+            logger.info(f"Completed download of {files_downloaded} files")
 
     def move_between_containers(
         self,
@@ -275,18 +359,61 @@ class CloudConnector:
         from_container = self._validate_container(src_container)
         to_container = self._validate_container(dst_container)
 
-        for blob_name in blob_names:
+        def _move_one(blob_name: str) -> None:
             src_blob = from_container.get_blob_client(blob_name)
             dst_blob = to_container.get_blob_client(blob_name)
-            dst_blob.start_copy_from_url(src_blob.url, standard_blob_tier=storage_tier.value)
+            copy = dst_blob.start_copy_from_url(src_blob.url, standard_blob_tier=storage_tier.blob_tier)
             if delete_src:
-                src_blob.delete_blob()
+                # The copy runs server-side and may still be pending; only delete the source once it has
+                # succeeded.
+                status: str | None = copy["copy_status"]
+                deadline = monotonic() + _COPY_TIMEOUT_SECONDS
+                while status == "pending":
+                    if monotonic() >= deadline:
+                        # Don't leave a stuck copy holding a pool thread (and this whole call) forever.
+                        dst_blob.abort_copy(copy["copy_id"])
+                        msg = (
+                            f"Copy of {blob_name} to {to_container.container_name} still pending after "
+                            f"{_COPY_TIMEOUT_SECONDS}s; aborted"
+                        )
+                        raise TimeoutError(msg)
+                    sleep(1)
+                    status = dst_blob.get_blob_properties().copy.status
+                if status != "success":
+                    msg = f"Copy of {blob_name} to {to_container.container_name} ended with status {status}"
+                    raise RuntimeError(msg)
 
             logger.debug(
-                f"Moved {blob_name} from {from_container.container_name} to {to_container.container_name}"
-                f" and {'deleted' if delete_src else 'did not delete'} the source"
+                f"Copied {blob_name} from {from_container.container_name} to {to_container.container_name}"
             )
 
+        # Each copy is a single request that the service completes asynchronously, so submit them in
+        # parallel rather than paying one round trip per blob.
+        first_exc: Exception | None = None
+        copied: list[str] = []
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = {executor.submit(_move_one, blob_name): blob_name for blob_name in blob_names}
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    copied.append(futures[future])
+                except Exception as e:
+                    logger.warning(f"Failed to move {futures[future]}: {e!s}")
+                    first_exc = first_exc or e
+
+        if delete_src:
+            # Delete the successfully copied sources in batch requests (at most 256 blobs per request).
+            for i in range(0, len(copied), 256):
+                chunk = copied[i : i + 256]
+                responses = from_container.delete_blobs(*chunk, raise_on_any_failure=False)
+                failed = [name for name, r in zip(chunk, responses, strict=True) if r.status_code >= 300]
+                if failed:
+                    logger.warning(f"Failed to delete {len(failed)} source blobs after copy: {failed}")
+            logger.debug(f"Deleted {len(copied)} source blobs from {from_container.container_name}")
+
+        if first_exc is not None:
+            raise first_exc
+
     def append_to_cloud(
         self, dst_container: str, src_file: Path, delete_src: bool, col_order: list[str] | None = None
     ) -> bool:
@@ -359,20 +486,38 @@ class CloudConnector:
             target_container = self._validate_container(dst_container)
             blob_client = target_container.get_blob_client(dst_file)
 
+            cache_key = f"{dst_container}/{dst_file}"
+            local_header = lines_to_append[0].rstrip("\r\n")
+            validated_header: str | None = None
+
             # Prevent multiple threads from updating the same file in cloud storage simultaneously.
             with self._get_append_lock(dst_file):
-                if not blob_client.exists():
+                header_known = (
+                    dst_file in self._validated_append_files
+                    or self._header_cache.get(cache_key) == local_header
+                )
+                if header_known:
+                    start_of_contents = None
+                    blob_exists = blob_client.exists()
+                else:
+                    # The read of the remote headers doubles as the existence check.
+                    start_of_contents = self._read_blob_head(blob_client)
+                    blob_exists = start_of_contents is not None
+
+                if not blob_exists:
                     # Create the blob and include the Headers.
                     blob_client.create_append_blob()
-                    data_to_append = "".join(lines_to_append[:])
-                elif dst_file in self._validated_append_files:
+                    data_to_append = "".join(lines_to_append)
+                    validated_header = local_header
+                elif header_known:
                     # Drop the Headers in the first line so we don't have repeat header rows.
-                    data_to_append = "".join(lines_to_append[1:])
+                    data_to_append = "".join(islice(lines_to_append, 1, None))
                 # It's our first time writing to this file since reboot. Validate that the headers match.
-                elif self._headers_match(blob_client, lines_to_append[0]):
+                elif self._headers_match(blob_client.blob_name, start_of_contents or "", lines_to_append[0]):
                     logger.debug(f"Headers match for {blob_client.blob_name}, appending data")
                     # Drop the Headers in the first line so we don't have repeat header rows.
-                    data_to_append = "".join(lines_to_append[1:])
+                    data_to_append = "".join(islice(lines_to_append, 1, None))
+                    validated_header = local_header
                 else:
                     logger.warning(
                         f"{root_cfg.RAISE_WARN()}Headers do not match for {dst_file}, "
@@ -381,6 +526,9 @@ class CloudConnector:
                     data_to_append = self._merge_local_and_remote(
                         dst_container, dst_file, lines_to_append, col_order
                     )
+                    # The blob is rewritten with the merged header, so that is what the cache must now hold;
+                    # otherwise a writer with the old header would be trusted after a restart.
+                    validated_header = data_to_append.partition("\n")[0].rstrip("\r")
 
                     # Re-create the append_blob - this replaces the existing file.
                     if blob_client.get_blob_properties().size == 0:
@@ -393,6 +541,9 @@ class CloudConnector:
                 # Record that we've validated this file (might already be true).
                 self._validated_append_files.add(dst_file)
 
+            if validated_header is not None:
+                self._save_header_cache(cache_key, validated_header)
+
             return True
         except Exception as e:
             if not swallow_exceptions:
@@ -414,21 +565,27 @@ class CloudConnector:
             src_file=dst_file,
             dst_file=tmp_file,
         )
-        # Merge the dataframes.
-        append_df = pd.read_csv(io.StringIO("".join(lines_to_append)))
-        try:
-            orig_df = pd.read_csv(tmp_file)
-        except pd.errors.EmptyDataError:
-            logger.warning(
-                f"{root_cfg.RAISE_WARN()}Remote append blob {dst_file} is empty; "
-                "recreating with incoming headers"
-            )
-            orig_df = pd.DataFrame(columns=append_df.columns)
-        merged_df = pd.concat([orig_df, append_df], ignore_index=True)
-
-        # Generate the CSV data to append (including the headers).
-        csv_buffer = io.StringIO()
-        merged_df.to_csv(csv_buffer, index=False, columns=col_order)
+        # Merge row by row into the union of the remote and local headers (remote columns first), streaming
+        # rather than loading both copies into DataFrames. Rows stay as csv.reader lists rather than dicts.
+        append_reader = csv.reader(lines_to_append)
+        append_header = next(append_reader, [])
+        with tmp_file.open("r", newline="") as remote:
+            orig_reader = csv.reader(remote)
+            orig_header = next(orig_reader, None)
+            if orig_header is None:
+                logger.warning(
+                    f"{root_cfg.RAISE_WARN()}Remote append blob {dst_file} is empty; "
+                    "recreating with incoming headers"
+                )
+                orig_header = []
+            fieldnames = col_order or list(dict.fromkeys([*orig_header, *append_header]))
+
+            # Generate the CSV data to append (including the headers).
+            csv_buffer = io.StringIO()
+            writer = csv.writer(csv_buffer, lineterminator="\n")
+            writer.writerow(fieldnames)
+            writer.writerows(_project_rows(orig_reader, orig_header, fieldnames))
+            writer.writerows(_project_rows(append_reader, append_header, fieldnames))
         data_to_append = csv_buffer.getvalue()
         tmp_file.unlink()  # Clean up the temporary file.
         return data_to_append
@@ -478,17 +635,14 @@ class CloudConnector:
         )
         container_client = self._validate_container(container)
 
-        files = []
-        if prefix is not None:
-            files = list(container_client.list_blob_names(name_starts_with=prefix))
-        else:
-            files = list(container_client.list_blob_names())
-
-        if suffix is not None:
-            files = [f for f in files if f.endswith(suffix)]
-
-        if more_recent_than is not None:
-            files = [f for f in files if file_naming.get_file_datetime(f) > more_recent_than]
+        # Filter the names as they stream in from the service rather than materialising the full listing.
+        # The suffix check runs first so that only matching names pay for timestamp parsing.
+        files = [
+            f
+            for f in container_client.list_blob_names(name_starts_with=prefix)
+            if (suffix is None or f.endswith(suffix))
+            and (more_recent_than is None or file_naming.get_file_datetime(f) > more_recent_than)
+        ]
         logger.debug(f"list_cloud_files returning {len(files)!s} files")
 
         return files
@@ -531,7 +685,7 @@ class CloudConnector:
         logger.debug("Shutting down CloudConnector")
         # No resources to release in this implementation, but we could close any open connections if needed
         self._validated_containers.clear()
-        CloudConnector._instance = None
+        CloudConnector._instances = {t: cc for t, cc in CloudConnector._instances.items() if cc is not self}
 
     def download_container_deltas(
         self,
@@ -555,27 +709,12 @@ class CloudConnector:
                 the file is downloaded in full.
         """
         download_container = self._validate_container(src_container)
-        files_downloaded = 0
 
-        # Create a pool of threads to download the files
-        with ThreadPoolExecutor(max_workers=8) as executor:
-            futures = []
-            for blob_name, offset in files_with_offsets.items():
-                blob_client = download_container.get_blob_client(blob_name)
-                dst_file = dst_dir / blob_name
-                futures.append(
-                    executor.submit(self._download_file, blob_client, dst_file, offset, append_only=True)
-                )
-                if len(futures) > 10_000:
-                    logger.info("Working on batch of 10,000 files")
-                    for future in as_completed(futures, timeout=600):
-                        future.result()
-                        files_downloaded += 1
-                    futures = []
-            logger.info(f"Downloading remaining {len(futures)} files")
-            for future in as_completed(futures, timeout=600):
-                future.result()
-                files_downloaded += 1
+        logger.info(f"Downloading {len(files_with_offsets)} files")
+        files_downloaded = self._download_files(
+            (download_container.get_blob_client(blob_name), dst_dir / blob_name, offset, True)
+            for blob_name, offset in files_with_offsets.items()
+        )
         logger.info(f"Completed download of {files_downloaded} files")
 
     def get_last_file_modified_time(
@@ -619,11 +758,11 @@ class CloudConnector:
         """
         for attempt in range(3):
             try:
+                # Stream straight into the file rather than holding the whole blob in memory.
                 with open(dst_file, "wb") as my_file:
-                    download_stream = blob_client.download_blob()
-                    file_bytes = download_stream.readall()
-                    my_file.write(file_bytes)
-                logger.info(f"Downloaded {dst_file.name}, {len(file_bytes):,} bytes")
+                    download_stream = blob_client.download_blob(max_concurrency=self._transfer_concurrency)
+                    bytes_read = download_stream.readinto(my_file)
+                logger.info(f"Downloaded {dst_file.name}, {bytes_read:,} bytes")
                 return
             except ResourceModifiedError:
                 logger.info(f"ResourceModifiedError on {dst_file} attempt {attempt + 1}")
@@ -668,6 +807,62 @@ class CloudConnector:
         descriptor = "bytes" if offset == 0 else "additional bytes"
         logger.info(f"Downloaded {dst_file.name}, {written:,} {descriptor}")
 
+    def _download_files(self, jobs: Iterable[tuple[BlobClient, Path, int, bool]]) -> int:
+        """Run _download_file for each (blob_client, dst_file, offset, append_only) job on a thread pool.
+
+        Submission is throttled so that only a bounded number of jobs are pending at once; the pool stays
+        busy without holding a future for every file of a large download. Stops submitting after the first
+        failure and re-raises it once the pending jobs have finished. Returns the number of files downloaded.
+        """
+        slots = BoundedSemaphore(_MAX_PENDING_DOWNLOADS)
+        results_lock = Lock()
+        errors: list[BaseException] = []
+        files_downloaded = 0
+
+        def _on_done(future: Future[str]) -> None:
+            nonlocal files_downloaded
+            slots.release()
+            exc = future.exception()
+            with results_lock:
+                if exc is None:
+                    files_downloaded += 1
+                else:
+                    errors.append(exc)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for job in jobs:
+                slots.acquire()
+                if errors:
+                    slots.release()
+                    break
+                executor.submit(self._download_file_with_retry, *job).add_done_callback(_on_done)
+
+        if errors:
+            raise errors[0]
+        return files_downloaded
+
+    def _download_file_with_retry(
+        self, blob_client: BlobClient, dst_file: Path, offset: int = 0, append_only: bool = False
+    ) -> str:
+        """_download_file, retried with exponential backoff while it fails with a transient network error.
+
+        A failed download would otherwise abort the whole batch. Uploads are not retried like this: the
+        AsyncCloudConnector's disk spool owns upload retries.
+        """
+        for attempt in range(_DOWNLOAD_ATTEMPTS - 1):
+            try:
+                return self._download_file(blob_client, dst_file, offset, append_only)
+            except Exception as e:
+                if not is_transient_network_error(e):
+                    raise
+                logger.info(f"Transient failure downloading {dst_file.name} (attempt {attempt + 1}): {e!s}")
+                if offset > 0:
+                    # A delta download appends chunk by chunk; drop any chunks that landed before the
+                    # failure so the retry doesn't write them a second time.
+                    _truncate_partial_download(dst_file, offset)
+                sleep(2**attempt)
+        return self._download_file(blob_client, dst_file, offset, append_only)
+
     def _download_file(
         self, blob_client: BlobClient, dst_file: Path, offset: int = 0, append_only: bool = False
     ) -> str:
@@ -692,9 +887,9 @@ class CloudConnector:
         Create the container if it does not already exist.
         """
         if container not in self._validated_containers:
-            container_client = ContainerClient.from_connection_string(
-                conn_str=self._get_connection_string(), container_name=container
-            )
+            if self._service_client is None:
+                self._service_client = BlobServiceClient.from_connection_string(self._get_connection_string())
+            container_client = self._service_client.get_container_client(container)
             if not container_client.exists():
                 logger.info(f"Creating container {container}")
                 # Suppress ResourceExistsError: it indicates that another thread or device created the
@@ -706,41 +901,87 @@ class CloudConnector:
 
         return self._validated_containers[container]
 
+    @staticmethod
+    def _load_header_cache() -> dict[str, str]:
+        try:
+            with _HEADER_CACHE_FILE.open("r") as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable header cache {_HEADER_CACHE_FILE}: {e!s}")
+            return {}
+        if not isinstance(cache, dict):
+            return {}
+        # Entries are saved oldest first; keep the most recent.
+        return dict(list(cache.items())[-_HEADER_CACHE_MAX_ENTRIES:])
+
+    def _save_header_cache(self, cache_key: str, header: str) -> None:
+        """Record a validated header and persist the cache; a failure to persist only costs a re-check.
+
+        The cache is kept in validation order and trimmed to the _HEADER_CACHE_MAX_ENTRIES most recent, so
+        entries for blobs the device no longer writes (eg earlier days' files) age out.
+        """
+        with self._append_locks_lock:
+            if self._header_cache.get(cache_key) == header:
+                return
+            self._header_cache.pop(cache_key, None)
+            self._header_cache[cache_key] = header
+            while len(self._header_cache) > _HEADER_CACHE_MAX_ENTRIES:
+                del self._header_cache[next(iter(self._header_cache))]
+            try:
+                tmp_file = _HEADER_CACHE_FILE.with_suffix(".tmp")
+                with tmp_file.open("w") as f:
+                    json.dump(self._header_cache, f)
+                os.replace(tmp_file, _HEADER_CACHE_FILE)
+            except OSError as e:
+                logger.warning(f"Failed to save header cache {_HEADER_CACHE_FILE}: {e!s}")
+
     def _get_connection_string(self) -> str:
         return self._connection_string
 
-    def _headers_match(self, blob_client: BlobClient, local_line: str) -> bool:
-        """Check if the headers in the local file match the headers in the remote file.
+    @staticmethod
+    def _read_blob_head(blob_client: BlobClient) -> str | None:
+        """Return the first _HEADER_PEEK_BYTES of the blob, or None if the blob does not exist."""
+        try:
+            head = blob_client.download_blob(offset=0, length=_HEADER_PEEK_BYTES).readall()
+        except ResourceNotFoundError:
+            return None
+        except HttpResponseError as e:
+            if e.status_code != 416:
+                raise
+            return ""  # A ranged read of an empty blob is rejected as an invalid range.
+        # The peek may end part way through a multibyte character; only the first line matters.
+        return head.decode("utf-8", errors="ignore")
+
+    def _headers_match(self, blob_name: str, start_of_contents: str, local_line: str) -> bool:
+        """Check if the headers in the local file match the headers at the start of the remote file.
 
         Returns false if either is empty or if the headers do not match.
         """
-        start_of_contents = blob_client.download_blob(encoding="utf-8").read(chars=1000)
-
         if not start_of_contents:
             return False  # No contents in the remote file
 
         if not local_line.strip():
-            logger.warning(f"{root_cfg.RAISE_WARN()}Local file {blob_client.blob_name} has no headers")
+            logger.warning(f"{root_cfg.RAISE_WARN()}Local file {blob_name} has no headers")
             return False  # No headers in the local file
 
         # Get the first line from start_of_contents
         cloud_lines = start_of_contents.splitlines()
         if len(cloud_lines) >= 1:
             # We have headers from local and cloud files; check headers match
-            local_reader = csv.reader([local_line])
-            cloud_reader = csv.reader([cloud_lines[0]])
-            local_headers = next(local_reader)
-            cloud_headers = next(cloud_reader)
+            local_headers = _split_header(local_line)
+            cloud_headers = _split_header(cloud_lines[0])
             if local_headers != cloud_headers:
                 logger.warning(
                     f"{root_cfg.RAISE_WARN()}Local and remote headers do not match in "
-                    f"{blob_client.blob_name}: {local_headers}, {cloud_headers}"
+                    f"{blob_name}: {local_headers}, {cloud_headers}"
                 )
                 return False
 
             # All is good; headers match
-            logger.debug(f"Headers match for {blob_client.blob_name}: {local_headers}")
+            logger.debug(f"Headers match for {blob_name}: {local_headers}")
             return True
 
-        logger.warning(f"{root_cfg.RAISE_WARN()}Remote file {blob_client.blob_name} has no headers")
+        logger.warning(f"{root_cfg.RAISE_WARN()}Remote file {blob_name} has no headers")
         return False
@@ -1,6 +1,8 @@
+import os
 import shutil
 from datetime import UTC, datetime
 from pathlib import Path
+from typing import BinaryIO
 
 from expidite_rpi.core import api, file_naming
 from expidite_rpi.core import configuration as root_cfg
@@ -8,6 +10,35 @@ from expidite_rpi.core.cloud_connector.cloud_connector import CloudConnector
 
 logger = root_cfg.setup_logger("expidite")
 
+# Buffer size used when streaming a local CSV into an emulated append blob.
+_COPY_BUFFER_BYTES = 128 * 1024
+# Largest chunk handed to a single os.copy_file_range call.
+_COPY_RANGE_CHUNK_BYTES = 1024 * 1024
+
+
+def _copy_file_tail(src: BinaryIO, src_offset: int, dst: BinaryIO, dst_offset: int) -> None:
+    """Copy everything in src from src_offset onwards into dst, starting at dst_offset.
+
+    Uses os.copy_file_range so that, on Linux, the data is copied in the kernel without passing through
+    user space. Neither file's position is used or moved by that call, which is why the offsets are explicit,
+    and dst must not be opened in append mode (the kernel rejects O_APPEND destinations). Where the call isn't
+    available or the filesystems don't support it, falls back to a buffered copy of whatever is left.
+    """
+    dst.flush()
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied := os.copy_file_range(
+                src.fileno(), dst.fileno(), _COPY_RANGE_CHUNK_BYTES, src_offset, dst_offset
+            ):
+                src_offset += copied
+                dst_offset += copied
+            return
+        except OSError:
+            pass  # Fall back to the buffered copy for whatever is left
+    src.seek(src_offset)
+    dst.seek(dst_offset)
+    shutil.copyfileobj(src, dst, _COPY_BUFFER_BYTES)
+
 
 ##############################################################################################################
 # LocalCloudConnector class
@@ -30,6 +61,10 @@ class LocalCloudConnector(CloudConnector):
             / root_cfg.my_device_id
             / api.utc_to_fname_str()
         )
+        # Container paths are rebuilt on every cloud op otherwise; containers already known to exist on disk
+        # skip the mkdir() call.
+        self._container_paths: dict[str, Path] = {}
+        self._known_containers: set[str] = set()
 
     def get_local_cloud(self) -> Path:
         """Creates a local cloud directory. Usually called by RpiEmulator.__enter__() as
@@ -38,14 +73,22 @@ class LocalCloudConnector(CloudConnector):
         This is an unpredictable string so we don't clash with other local cloud instances.
         """
         # shutil.rmtree(self.local_cloud)
-        if not self.local_cloud.exists():
-            self.local_cloud.mkdir(parents=True, exist_ok=True)
+        self.local_cloud.mkdir(parents=True, exist_ok=True)
         return self.local_cloud
 
     def clear_local_cloud(self) -> None:
         """Clear the local cloud storage - this is used for testing only."""
         if self.local_cloud.exists():
             shutil.rmtree(self.local_cloud)
+        self._known_containers.clear()
+
+    def _container_path(self, container: str) -> Path:
+        """Return the local directory that emulates the container, memoized per container name."""
+        path = self._container_paths.get(container)
+        if path is None:
+            path = self.local_cloud / container
+            self._container_paths[container] = path
+        return path
 
     def upload_to_container(
         self,
@@ -69,11 +112,12 @@ class LocalCloudConnector(CloudConnector):
         been deleted (if delete_src=True), while any remaining files in src_files will not have been
         deleted.
         """
+        dst_root = self._container_path(dst_container)
         for file in src_files:
             if file.exists():
                 # Copy the file to the local cloud directory
-                dst_file = self.local_cloud / dst_container / file.name
-                dst_file.parent.mkdir(parents=True, exist_ok=True)
+                dst_file = dst_root / file.name
+                self.container_exists(dst_container)
                 if delete_src:
                     shutil.move(file, dst_file)
                 else:
@@ -81,13 +125,10 @@ class LocalCloudConnector(CloudConnector):
 
     def download_from_container(self, src_container: str, src_file: str, dst_file: Path) -> None:
         """Downloads the src_file to a local dst_file Path."""
-        if not dst_file.parent.exists():
-            dst_file.parent.mkdir(parents=True, exist_ok=True)
-
-        if dst_file.exists():
-            dst_file.unlink()
+        dst_file.parent.mkdir(parents=True, exist_ok=True)
+        dst_file.unlink(missing_ok=True)
 
-        shutil.copy(self.local_cloud / src_container / src_file, dst_file)
+        shutil.copy(self._container_path(src_container) / src_file, dst_file)
 
     def download_container(
         self,
@@ -107,7 +148,9 @@ class LocalCloudConnector(CloudConnector):
                 will be downloaded; useful for chunking downloads
             overwrite: If False, function will skip downloading files that already exist in dst_dir
         """
-        download_container = self.local_cloud / src_container
+        download_container = self._container_path(src_container)
+        # Many blobs share a folder, so only create each one once.
+        created_dirs: set[Path] = set()
 
         if files is None:
             for blob in download_container.glob("*"):
@@ -115,8 +158,9 @@ class LocalCloudConnector(CloudConnector):
                     folder_dir = dst_dir / blob.name[:folder_prefix_len]
                 else:
                     folder_dir = dst_dir
-                if not folder_dir.exists():
+                if folder_dir not in created_dirs:
                     folder_dir.mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(folder_dir)
                 shutil.copy(blob, folder_dir)
         else:
             for blob_name in files:
@@ -129,6 +173,9 @@ class LocalCloudConnector(CloudConnector):
                 if not overwrite and dst_file.exists():
                     logger.debug(f"File {dst_file} already exists; skipping download")
                     continue
+                if folder_dir not in created_dirs:
+                    folder_dir.mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(folder_dir)
                 shutil.copy(src_file, dst_file)
 
     def move_between_containers(
@@ -147,12 +194,16 @@ class LocalCloudConnector(CloudConnector):
             blob_names: list of blob names to move
             delete_src: delete the source blobs after successful upload; defaults to False
         """
+        src_root = self._container_path(src_container)
+        dst_root = self._container_path(dst_container)
         for blob_name in blob_names:
-            shutil.copy(
-                self.local_cloud / src_container / blob_name, self.local_cloud / dst_container / blob_name
-            )
+            src_blob = src_root / blob_name
+            dst_blob = dst_root / blob_name
             if delete_src:
-                (self.local_cloud / src_container / blob_name).unlink()
+                # Both containers live under local_cloud, so this is a rename rather than a copy.
+                shutil.move(src_blob, dst_blob)
+            else:
+                shutil.copy(src_blob, dst_blob)
 
             logger.debug(
                 f"Moved {blob_name} from {src_container} to {dst_container}"
@@ -178,29 +229,25 @@ class LocalCloudConnector(CloudConnector):
         It the responsibility of the calling function to ensure that the columns & headers in the
         CSV data are consistent between local and remote files
         """
-        blob_client = self.local_cloud / dst_container / src_file.name
+        blob_client = self._container_path(dst_container) / src_file.name
         try:
             logger.debug(f"LocalCC.append_to_cloud() with delete_src={delete_src} for {src_file}")
 
-            # Read the local file data ready to append
-            with src_file.open("r") as file:
-                local_lines = file.readlines()
-                if len(local_lines) == 1:
+            # Stream the local file into the blob rather than reading it into memory.
+            with src_file.open("rb") as src:
+                header = src.readline()
+                if os.fstat(src.fileno()).st_size == len(header):
                     return False  # No data beyond headers
 
-            if not blob_client.exists():
-                # Include the Headers
-                data_to_append = "".join(local_lines[:])
-                # Create the file
-                blob_client.parent.mkdir(parents=True, exist_ok=True)
-                blob_client.touch()
-            else:
-                # Drop the Headers in the first line so we don't have repeat header rows.
-                data_to_append = "".join(local_lines[1:])
-
-            # Append the data to the local file
-            with blob_client.open("a") as blob_file:
-                blob_file.write(data_to_append)
+                blob_exists = blob_client.exists()
+                if not blob_exists:
+                    self.container_exists(dst_container)
+                # Not opened in append mode ("ab"), which would stop _copy_file_tail copying in the kernel.
+                with blob_client.open("r+b" if blob_exists else "wb") as blob_file:
+                    if not blob_exists:
+                        # Include the Headers. Otherwise they're dropped so we don't have repeat header rows.
+                        blob_file.write(header)
+                    _copy_file_tail(src, len(header), blob_file, blob_file.seek(0, os.SEEK_END))
 
             if delete_src:
                 logger.debug(f"Deleting append file: {src_file}")
@@ -214,26 +261,30 @@ class LocalCloudConnector(CloudConnector):
     def container_exists(self, container: str) -> bool:
         """Check if the specified container exists."""
         # We always return true in the emulator; creating the container if it doesn't exist
-        container_client = self.local_cloud / container
-        if not container_client.exists():
-            container_client.mkdir(parents=True, exist_ok=True)
+        if container not in self._known_containers:
+            self._container_path(container).mkdir(parents=True, exist_ok=True)
+            self._known_containers.add(container)
         return True
 
     def create_container(self, container: str) -> None:
         """Create the specified container."""
-        container_client = self.local_cloud / container
-        if not container_client.exists():
-            logger.info(f"Creating container {container}")
-            container_client.mkdir(parents=True, exist_ok=True)
+        if container in self._known_containers:
+            return
+        try:
+            self._container_path(container).mkdir(parents=True)
+            logger.info(f"Created container {container}")
+        except FileExistsError:
+            pass
+        self._known_containers.add(container)
 
     def exists(self, src_container: str, blob_name: str) -> bool:
         """Check if the specified blob exits."""
-        blob_client = self.local_cloud / src_container / blob_name
+        blob_client = self._container_path(src_container) / blob_name
         return blob_client.exists()
 
     def delete(self, container: str, blob_name: str) -> None:
         """Delete specified blob."""
-        blob_client = self.local_cloud / container / blob_name
+        blob_client = self._container_path(container) / blob_name
         blob_client.unlink()
 
     def list_cloud_files(
@@ -254,28 +305,34 @@ class LocalCloudConnector(CloudConnector):
         The current backend implementation is the Azure Blobstore which only supports prefix search
         and tag search.
         """
-        container_client = self.local_cloud / container
+        container_client = self._container_path(container)
 
-        query = f"{prefix}*" if prefix is not None else "*"
-        file_paths = list(container_client.glob(query))
-        files = [f.name for f in file_paths]
-
-        if suffix is not None:
-            files = [f for f in files if f.endswith(suffix)]
-
-        if more_recent_than is not None:
-            files = [f for f in files if file_naming.get_file_datetime(f) > more_recent_than]
+        # One pass over the directory, matching on names; the timestamp is only parsed for names that match.
+        try:
+            with os.scandir(container_client) as entries:
+                files = [
+                    entry.name
+                    for entry in entries
+                    if (prefix is None or entry.name.startswith(prefix))
+                    and (suffix is None or entry.name.endswith(suffix))
+                    and (
+                        more_recent_than is None
+                        or file_naming.get_file_datetime(entry.name) > more_recent_than
+                    )
+                ]
+        except FileNotFoundError:
+            files = []
         logger.debug(f"list_cloud_files returning {len(files)!s} files")
 
         return files
 
     def get_blob_modified_time(self, container: str, blob_name: str) -> datetime:
         """Get the last modified time of the specified blob."""
-        container_client = self.local_cloud / container
-        blob_client = container_client / blob_name
-        if blob_client.exists():
+        blob_client = self._container_path(container) / blob_name
+        try:
             last_modified = blob_client.stat().st_mtime
-            # The Azure timezone is UTC but it's not explicitly set; set it
-            return datetime.fromtimestamp(last_modified, tz=UTC)
-        logger.warning(f"Blob {blob_name} does not exist in container {container}")
-        return datetime.min.replace(tzinfo=UTC)
+        except FileNotFoundError:
+            logger.warning(f"Blob {blob_name} does not exist in container {container}")
+            return datetime.min.replace(tzinfo=UTC)
+        # The Azure timezone is UTC but it's not explicitly set; set it
+        return datetime.fromtimestamp(last_modified, tz=UTC)
@@ -130,7 +130,7 @@ class Rule7_reserved_fieldnames(ValidationRule):
                 fields = stream.fields
                 if fields is not None:
                     for field in fields:
-                        if field in api.ALL_RECORD_ID_FIELDS:
+                        if field in api.ALL_RECORD_ID_FIELDS_SET:
                             return False, (
                                 f"output field {field} is reserved in {dpnode} for {stream.type_id}"
                             )
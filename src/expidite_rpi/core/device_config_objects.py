@@ -1,7 +1,9 @@
 from collections.abc import Callable
 from dataclasses import dataclass, field
+from functools import cache
 from typing import Any
 
+from pydantic import PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from expidite_rpi.core.api import LedsInstalled
@@ -20,6 +22,11 @@ from expidite_rpi.utils import utils_clean
 FAILED_TO_LOAD = "Not set"
 
 
+@cache
+def _field_name_set(cls: type) -> frozenset[str]:
+    return frozenset(utils_clean.dataclass_field_names(cls))
+
+
 @dataclass
 class Configuration:
     """Utility super class."""
@@ -28,6 +35,17 @@ class Configuration:
         setattr(self, field_name, value)
 
     def update_fields(self, **kwargs: Any) -> None:  # noqa: ANN401
+        """Update several fields at once.
+
+        When every name is a dataclass field the values are written straight into the instance __dict__.
+        Subclasses that need to intercept assignment (custom __setattr__ or frozen) must override this.
+        """
+        # Widened to `type`: dataclass instances are unhashable (eq=True sets __hash__ = None), which mypy
+        # carries over to type[Configuration] and rejects as a cache key. The class object itself hashes fine.
+        cls: type = type(self)
+        if kwargs.keys() <= _field_name_set(cls):
+            self.__dict__.update(kwargs)
+            return
         for field_name, value in kwargs.items():
             self.update_field(field_name, value)
 
@@ -95,6 +113,11 @@ class DeviceCfg(Configuration):
     # Cloud storage container for diagnostics bundles.
     cc_for_diagnostics_bundles: str = "expidite-diags"
 
+    # Number of uploads and appends the AsyncCloudConnector runs concurrently. They have separate pools so
+    # that slow appends can't starve uploads and vice versa.
+    cc_upload_pool_size: int = 8
+    cc_append_pool_size: int = 4
+
     # Frequency of sending device health heart beat
     heart_beat_frequency: int = 60 * 10
 
@@ -140,19 +163,26 @@ class Keys(BaseSettings):
     dps_scope_id: str = FAILED_TO_LOAD
     dps_primary_key: str = FAILED_TO_LOAD
     model_config = SettingsConfigDict(extra="ignore")
+    # (cloud_storage_key, storage account) from the last get_storage_account parse.
+    _storage_account: tuple[str, str] | None = PrivateAttr(default=None)
 
     def get_storage_account(self) -> str:
         """Return the storage account name from the key."""
-        try:
-            # Extract the storage account name from the key
-            if "AccountName=" in self.cloud_storage_key:
-                storage_account = self.cloud_storage_key.split("AccountName=")[1].split(";")[0]
-            else:
-                storage_account = self.cloud_storage_key.split("https://")[1].split(".")[0]
-            return storage_account
-        except Exception as e:
-            print(f"Failed to extract storage account from key: {e}")
-            return "unknown"
+        key = self.cloud_storage_key
+        if self._storage_account is not None and self._storage_account[0] == key:
+            return self._storage_account[1]
+        # Extract the storage account name from the key
+        _, found, rest = key.partition("AccountName=")
+        if found:
+            storage_account = rest.partition(";")[0]
+        else:
+            _, found, rest = key.partition("https://")
+            if not found:
+                print("Failed to extract storage account from key: no AccountName or https:// URL")
+                return "unknown"
+            storage_account = rest.partition(".")[0]
+        self._storage_account = (key, storage_account)
+        return storage_account
 
 
 class SystemCfg(BaseSettings):
@@ -1,7 +1,10 @@
+import heapq
 import os
 import socket
 import subprocess
 from datetime import UTC, datetime, time, timedelta
+from pathlib import Path
+from time import monotonic
 from typing import Any
 
 import psutil
@@ -22,6 +25,7 @@ if root_cfg.running_on_rpi:
         min_priority: int | None = None,
         grep_str: list[str] | None = None,
         max_logs: int = 1000,
+        include_tagged: bool = True,
     ) -> list[dict[str, Any]]:
         """Fetch logs from the system journal.
 
@@ -30,6 +34,9 @@ if root_cfg.running_on_rpi:
             min_priority (int): The priority level (e.g., 6 for informational, 4 for warnings).
             grep_str (list[str]): List of strings to filter log messages.
             max_logs (int): Maximum number of logs to fetch.
+            include_tagged (bool): Also return entries below min_priority that carry RAISE_WARN_TAG. Set
+                False to have journald apply the min_priority filter itself, so lower-priority entries are
+                never read.
 
         Returns:
             list[dict[str, Any]]: A list of log entries.
@@ -43,6 +50,8 @@ if root_cfg.running_on_rpi:
 
         try:
             # Set filters.
+            if min_priority is not None and not include_tagged:
+                reader.log_level(min_priority)
             if since:
                 reader.seek_realtime(since.timestamp())
 
@@ -77,12 +86,16 @@ else:
         min_priority: int | None = None,
         grep_str: list[str] | None = None,
         max_logs: int = 1000,
+        include_tagged: bool = True,
     ) -> list[dict[str, Any]]:
         return []
 
 
 logger = root_cfg.setup_logger("expidite")
 
+# The Raspberry Pi exposes the CPU temperature (in millidegrees C) as thermal zone 0.
+_CPU_THERMAL_ZONE = Path("/sys/class/thermal/thermal_zone0/temp")
+
 # HEART - special datastream for recording device & system health
 HEART_FIELDS = [
     "boot_time",
@@ -127,30 +140,38 @@ WARNING_STREAM_INDEX = 1
 # staleness that accrued while it was up and able to upload, so we reboot only when the file has been stale
 # for this long AND the device has been up at least this long (see check_azure_connection()).
 HEART_STALE_THRESHOLD = timedelta(hours=6)
-DEVICE_HEALTH_CFG = SensorCfg(
-    sensor_type=api.SENSOR_TYPE.SYS,
-    sensor_index=0,
-    sensor_model="DeviceHealth",
-    description="Internal device health",
-    outputs=[
-        Stream(
-            "Health heartbeat stream",
-            api.HEART_DS_TYPE_ID,
-            HEART_STREAM_INDEX,
-            format=api.FORMAT.LOG,
-            fields=HEART_FIELDS,
-            cloud_container=root_cfg.my_device.cc_for_system_records,
-        ),
-        Stream(
-            "Warning log stream",
-            api.WARNING_DS_TYPE_ID,
-            WARNING_STREAM_INDEX,
-            format=api.FORMAT.LOG,
-            fields=WARNING_FIELDS,
-            cloud_container=root_cfg.my_device.cc_for_system_records,
-        ),
-    ],
-)
+
+
+def get_device_health_cfg() -> SensorCfg:
+    """Build the DeviceHealth SensorCfg for the current device.
+
+    Built on demand rather than at import so that the system-records container comes from the device config
+    in force when DeviceHealth is created, not the placeholder config present when this module is imported.
+    """
+    return SensorCfg(
+        sensor_type=api.SENSOR_TYPE.SYS,
+        sensor_index=0,
+        sensor_model="DeviceHealth",
+        description="Internal device health",
+        outputs=[
+            Stream(
+                "Health heartbeat stream",
+                api.HEART_DS_TYPE_ID,
+                HEART_STREAM_INDEX,
+                format=api.FORMAT.LOG,
+                fields=HEART_FIELDS,
+                cloud_container=root_cfg.my_device.cc_for_system_records,
+            ),
+            Stream(
+                "Warning log stream",
+                api.WARNING_DS_TYPE_ID,
+                WARNING_STREAM_INDEX,
+                format=api.FORMAT.LOG,
+                fields=WARNING_FIELDS,
+                cloud_container=root_cfg.my_device.cc_for_system_records,
+            ),
+        ],
+    )
 
 
 class DeviceHealth(Sensor):
@@ -162,7 +183,7 @@ class DeviceHealth(Sensor):
     """
 
     def __init__(self, device_manager: DeviceManager | None = None) -> None:
-        super().__init__(DEVICE_HEALTH_CFG)
+        super().__init__(get_device_health_cfg())
         ######################################################################################################
         # Telemetry tracking
         ######################################################################################################
@@ -184,6 +205,9 @@ class DeviceHealth(Sensor):
         try:
             logger.info(f"Starting DeviceHealth thread {self!r}")
 
+            # Heartbeats are scheduled against a monotonic deadline so the time spent in each iteration
+            # doesn't push every later heartbeat back.
+            next_run = monotonic()
             while not self.stop_requested.is_set():
                 try:
                     self.log_health()
@@ -197,7 +221,13 @@ class DeviceHealth(Sensor):
 
                 # Set timer for next run.
                 self.log_counter += 1
-                sleep_time = root_cfg.my_device.heart_beat_frequency
+                next_run += root_cfg.my_device.heart_beat_frequency
+                sleep_time = next_run - monotonic()
+                if sleep_time <= 0:
+                    # The iteration overran its slot (or the device was suspended): run again now and
+                    # re-anchor the schedule rather than firing a burst of catch-up heartbeats.
+                    next_run = monotonic()
+                    sleep_time = 0
                 self.stop_requested.wait(sleep_time)
         except Exception:
             logger.exception(f"{root_cfg.RAISE_WARN()}Error in DeviceHealth thread")
@@ -214,7 +244,8 @@ class DeviceHealth(Sensor):
         Priorities are recorded as journald reported them.
         """
         if root_cfg.running_on_rpi:
-            logs = get_logs(since=self.last_ran, min_priority=4)
+            # Only priority <= 4 qualifies below, so let journald drop everything else.
+            logs = get_logs(since=self.last_ran, min_priority=4, include_tagged=False)
             self.last_ran = api.utc_now()
 
             for log in logs:
@@ -308,10 +339,15 @@ class DeviceHealth(Sensor):
             sc_mount_size = ""
             get_throttled_output = ""
             process_list_str = ""
+            # (rss, process info) for every process, gathered only when memory is high enough to need them.
+            processes_by_memory: list[tuple[int, dict[str, Any]]] | None = None
             ssid = ""
             signal_strength = ""
+            # Take each psutil reading once and reuse it below; each call is a separate /proc read or statvfs.
+            vmem = psutil.virtual_memory()
+            mount_usage = psutil.disk_usage(str(root_cfg.ROOT_WORKING_DIR))
             if root_cfg.running_on_rpi:
-                cpu_temp = str(psutil.sensors_temperatures()["cpu_thermal"][0].current)  # type: ignore
+                cpu_temp = DeviceHealth.get_cpu_temperature()
 
                 # Get the connected SSID
                 ssid, signal_strength = DeviceHealth.get_wifi_ssid_and_signal()
@@ -338,21 +374,24 @@ class DeviceHealth(Sensor):
                 self.cum_bytes_sent = latest_bytes_sent
 
                 # Get the size of the /rpi_core mount
-                usage = psutil.disk_usage(str(root_cfg.ROOT_WORKING_DIR))
-                sc_mount_size = f"{usage.total / (1024**3):.2f} GB"
+                sc_mount_size = f"{mount_usage.total / (1024**3):.2f} GB"
 
-                # Running processes.
-                # Drop any starting / or . characters.
-                # And convert the process list to a simple comma-separated string with no {} or ' or "
+                # Running processes, plus per-process memory if we're going to log the top memory users
+                # below; one walk of the process table serves both.
+                # Convert the process list to a simple, sorted comma-separated string with no ' or "
                 # characters.
-                if root_cfg.system_cfg:
-                    process_set = utils.check_running_processes(
-                        search_string=f"{root_cfg.system_cfg.my_start_script}"
-                    ).union(utils.check_running_processes(search_string="python "))
-                    process_list_str = str(process_set).replace("{", "").replace("}", "")
-                    process_list_str = process_list_str.replace("'", "").replace('"', "").strip()
-                else:
-                    process_list_str = ""
+                memory_alert = check_memory_usage and vmem.percent > root_cfg.WARN_AT_MEMORY_PERCENT
+                if root_cfg.system_cfg or memory_alert:
+                    search_strings = (
+                        [f"{root_cfg.system_cfg.my_start_script}", "python "] if root_cfg.system_cfg else []
+                    )
+                    process_set, all_processes = DeviceHealth._scan_processes(
+                        search_strings, include_memory_info=memory_alert
+                    )
+                    if memory_alert:
+                        processes_by_memory = all_processes
+                    if root_cfg.system_cfg:
+                        process_list_str = ", ".join(sorted(process_set))
 
             # Check update status by getting the last modified time of the rpi_installer_ran file
             # This file is created when the rpi_installer.sh script is run and is used to track the last time
@@ -392,14 +431,13 @@ class DeviceHealth(Sensor):
                 self.last_ping_success_count_all = self.device_manager.ping_success_count_all
 
             # Total memory
-            total_memory = psutil.virtual_memory().total
-            total_memory_gb = round(total_memory / (1024**3), 2)
+            total_memory_gb = round(vmem.total / (1024**3), 2)
 
             # Memory usage - if greater than threshold then generate some diagnostics
-            memory_usage = psutil.virtual_memory().percent
+            memory_usage = vmem.percent
             if check_memory_usage and memory_usage > root_cfg.WARN_AT_MEMORY_PERCENT:
                 if root_cfg.running_on_rpi:
-                    DeviceHealth.log_top_memory_processes()
+                    DeviceHealth.log_top_memory_processes(processes=processes_by_memory)
                     # Running low on free RAM can cause any OS process to be killed to free up memory, and
                     # can cause performance degradation; a controlled reboot recovers before that happens.
                     # This should be rare: the AsyncCloudConnector diverts its queue to the disk spool at
@@ -422,12 +460,12 @@ class DeviceHealth(Sensor):
                 "cpu_percent": str(psutil.cpu_percent(0)),
                 "total_memory_gb": str(total_memory_gb),
                 "memory_percent": str(memory_usage),
-                "memory_free": str(int(psutil.virtual_memory().free / 1000000)) + "M",
+                "memory_free": str(int(vmem.free / 1000000)) + "M",
                 "disk_percent": str(psutil.disk_usage("/").percent),
                 "disk_bytes_written_in_period": str(bytes_written),
                 "io_bytes_sent": str(bytes_sent),
                 "expidite_mount_size": str(sc_mount_size),
-                "expidite_mount_percent": str(psutil.disk_usage(str(root_cfg.ROOT_WORKING_DIR)).percent),
+                "expidite_mount_percent": str(mount_usage.percent),
                 "packet_loss": str(packet_loss),
                 "current_ping_fail_run": str(ping_failure_count_run),
                 "cpu_temperature": str(cpu_temp),
@@ -450,30 +488,66 @@ class DeviceHealth(Sensor):
 
         return health
 
-    # Function to get diagnostics on the top 3 memory-using processes
     @staticmethod
-    def log_top_memory_processes(num_processes: int = 5) -> None:
-        # Create a list of all processes with their memory usage
-        # It's possible for processes to disappear between the time we get the list and the time we log it so
-        # we need to be careful about this
-        processes = []
-        for proc in psutil.process_iter(attrs=["pid", "name", "memory_info", "cmdline"]):
-            try:
+    def _scan_processes(
+        search_strings: list[str], include_memory_info: bool
+    ) -> tuple[set[str], list[tuple[int, dict[str, Any]]]]:
+        """Walk the process table once for both the heartbeat process list and the memory diagnostics.
+
+        Returns the command line segments containing any of search_strings (as
+        utils.check_running_processes_multi) and, if include_memory_info, an (rss, process info) pair for
+        every process.
+        """
+        process_set: set[str] = set()
+        processes: list[tuple[int, dict[str, Any]]] = []
+        attrs = ["pid", "name", "memory_info", "cmdline"] if include_memory_info else ["cmdline"]
+        # process_iter skips processes that disappear mid-walk and leaves unreadable attributes as None.
+        for proc in psutil.process_iter(attrs=attrs):
+            info = proc.info
+            if search_strings:
+                # cmdline can be None (e.g. for kernel threads or access denied).
+                for line in info.get("cmdline") or []:
+                    for segment in line.split(" "):
+                        if any(search_string in segment for search_string in search_strings):
+                            process_set.add(segment)
+            if include_memory_info:
                 # The memory_info is in a pmem object, so we need to extract the rss value. It can be None if
                 # the process has gone away between listing and reading it, so we skip those.
-                mem_info = proc.info["memory_info"]
-                if mem_info is None:
-                    continue
-                processes.append((mem_info.rss, proc.info))
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+                mem_info = info.get("memory_info")
+                if mem_info is not None:
+                    processes.append((mem_info.rss, info))
+        return process_set, processes
+
+    @staticmethod
+    def get_cpu_temperature() -> str:
+        """Return the CPU temperature in degrees C, as psutil would report it.
+
+        Reads the Pi's CPU thermal zone directly rather than having psutil.sensors_temperatures() parse every
+        hwmon and thermal entry; falls back to psutil if the file can't be read.
+        """
+        try:
+            with _CPU_THERMAL_ZONE.open() as f:
+                return str(int(f.read()) / 1000)
+        except (OSError, ValueError):
+            return str(psutil.sensors_temperatures()["cpu_thermal"][0].current)  # type: ignore
+
+    # Function to get diagnostics on the top memory-using processes
+    @staticmethod
+    def log_top_memory_processes(
+        num_processes: int = 5, processes: list[tuple[int, dict[str, Any]]] | None = None
+    ) -> None:
+        """Log the processes using the most memory.
+
+        processes: (rss, process info) pairs from _scan_processes; scanned here if not supplied.
+        """
+        if processes is None:
+            _, processes = DeviceHealth._scan_processes([], include_memory_info=True)
 
-        # Sort the list of processes by memory usage (rss) in descending order
-        all_processes = sorted(processes, key=lambda x: x[0], reverse=True)
-        top_processes = all_processes[:num_processes]
+        # Pick the processes using the most memory (rss), largest first
+        top_processes = heapq.nlargest(num_processes, processes, key=lambda x: x[0])
 
         # Format the information for the top processes
-        log_string = f"Memory at {psutil.virtual_memory().percent}%; top processes: "
+        parts: list[str] = []
         for rss, info in top_processes:
             # Combine the command line arguments into a single string, but drop any words starting with "-".
             # cmdline can be None (e.g. for kernel threads), so default to an empty list.
@@ -481,8 +555,8 @@ class DeviceHealth(Sensor):
                 cmd_line = " ".join([arg for arg in (info.get("cmdline") or []) if not arg.startswith("-")])
             else:
                 cmd_line = info["name"]
-            log_string += f"[{cmd_line}]({info['pid']})={rss / (1024**2):.2f}MB, "
-        logger.warning(log_string)
+            parts.append(f"[{cmd_line}]({info['pid']})={rss / (1024**2):.2f}MB")
+        logger.warning(f"Memory at {psutil.virtual_memory().percent}%; top processes: {', '.join(parts)}")
 
     @staticmethod
     def get_wifi_ssid_and_signal() -> tuple[str, str]:
@@ -502,8 +576,9 @@ class DeviceHealth(Sensor):
     @staticmethod
     def get_wifi_ssid_and_signal_on_rpi() -> tuple[str, str]:
         try:
+            # Filter for the in-use network in Python rather than piping through grep in the shell.
             output = utils.run_cmd(
-                cmd="nmcli -g SSID,IN-USE,SIGNAL device wifi | grep '*'", ignore_errors=True
+                cmd="nmcli -g SSID,IN-USE,SIGNAL device wifi", ignore_errors=True, grep_strs=[":*:"]
             )
             # The return output contains a string like "SSID:*:95". We need to strip out the ":*" and return
             # just the SSID and the signal strength.
@@ -2,9 +2,12 @@
 # - Wifi
 # - LED indicator status
 import shlex
+import socket
+import struct
 import subprocess
 from enum import IntEnum, auto
-from time import sleep
+from threading import Event
+from time import monotonic
 
 from expidite_rpi.core import api, reboot
 from expidite_rpi.core import configuration as root_cfg
@@ -13,6 +16,16 @@ from expidite_rpi.utils import utils
 
 logger = root_cfg.setup_logger("expidite")
 
+# Connectivity is checked by pinging Google's public DNS server.
+_PING_HOST = "8.8.8.8"
+# ICMP echo request header (type 8, code 0, checksum, identifier, sequence 1) plus a small payload.
+_ICMP_ECHO_REQUEST = struct.pack("!BBHHH", 8, 0, 0, 0, 1) + b"expidite"
+
+# After this many consecutive successful pings, the wifi check interval is doubled, up to
+# MAX_WIFI_CHECK_INTERVAL seconds.
+PING_BACKOFF_AFTER_SUCCESSES = 6
+MAX_WIFI_CHECK_INTERVAL = 60.0
+
 
 class DeviceState(IntEnum):
     BOOTING = auto()
@@ -27,6 +40,11 @@ class DeviceManager:
     - manage_leds: bool = True
     """  # noqa: D415
 
+    # What set_led_status last wrote to LED_STATUS_FILE, and the file's mtime straight afterwards. Class-level
+    # defaults, replaced per instance on the first write.
+    _last_led_written: tuple[str, str] | None = None
+    _last_led_mtime_ns = 0
+
     def __init__(self) -> None:
         if not root_cfg.system_cfg.is_valid:
             logger.error(f"{root_cfg.RAISE_WARN()}DeviceManager: system_cfg is None; exiting")
@@ -40,9 +58,14 @@ class DeviceManager:
         self.diagnostics_upload_timer: utils.RepeatTimer | None = None
         self.current_state = DeviceState.BOOTING
         self.ping_check_interval = 10.0  # seconds
+        self.wifi_check_interval = self.ping_check_interval  # Current interval, backed off while healthy
+        self._icmp_socket_available = True
+        # Set by stop() so that a recovery sequence in progress on the wifi timer thread exits promptly.
+        self._stop_event = Event()
 
     def start(self) -> None:
         """Start the DeviceManager threads."""
+        self._stop_event.clear()
         ######################################################################################################
         # Wifi management
         ######################################################################################################
@@ -51,14 +74,18 @@ class DeviceManager:
         self.ping_failure_count_run = 0
         self.ping_success_count_run = 0
         self.last_ping_was_ok = False
+        self.wifi_check_interval = self.ping_check_interval
         self.log_counter = 0
         self.wifi_log_frequency = 60 * 10
         self.client_wlan = "wlan0"
+        # Read once here rather than on every timer tick; like wifi_clients, these are fixed for the run.
+        self.attempt_recovery = root_cfg.my_device.attempt_wifi_recovery
+        self.leds_installed = root_cfg.my_device.leds_installed
         if root_cfg.my_device.wifi_clients:
             self.inject_wifi_clients()
 
         # Start wifi management thread
-        if root_cfg.running_on_rpi and root_cfg.my_device.attempt_wifi_recovery:
+        if root_cfg.running_on_rpi and self.attempt_recovery:
             self.wifi_timer = utils.RepeatTimer(
                 interval=self.ping_check_interval, function=self.wifi_timer_callback
             )
@@ -93,6 +120,7 @@ class DeviceManager:
 
     def stop(self) -> None:
         """Stop the DeviceManager threads."""
+        self._stop_event.set()
         if self.led_timer is not None:
             self.led_timer.cancel()
             logger.info("DeviceManager LED timer stopped")
@@ -125,7 +153,7 @@ class DeviceManager:
     # Set the LEDs to ON or OFF as appropriate given the current device state.
     def led_timer_callback(self) -> None:
         logger.debug("LED timer callback")
-        if root_cfg.my_device.leds_installed == api.LedsInstalled.RED_ONLY:
+        if self.leds_installed == api.LedsInstalled.RED_ONLY:
             self._set_leds_red_only()
         else:
             self._set_leds_red_and_green()
@@ -184,8 +212,18 @@ class DeviceManager:
             - status: "on", "off", "blink",
         """
         try:
+            # The LED state rarely changes, so skip the write if the file still holds what we last wrote.
+            # Comparing the mtime catches the file being rewritten by something else (eg bcli) or removed.
+            if (colour, status) == self._last_led_written:
+                try:
+                    if root_cfg.LED_STATUS_FILE.stat().st_mtime_ns == self._last_led_mtime_ns:
+                        return
+                except FileNotFoundError:
+                    pass
             with open(root_cfg.LED_STATUS_FILE, "w") as f:
                 f.write(f"{colour}:{status}\n")
+            self._last_led_written = (colour, status)
+            self._last_led_mtime_ns = root_cfg.LED_STATUS_FILE.stat().st_mtime_ns
         except Exception:
             logger.exception(f"{root_cfg.RAISE_WARN()}set_led_status threw an exception")
 
@@ -199,7 +237,7 @@ class DeviceManager:
         self.wifi_clients = root_cfg.my_device.wifi_clients
 
         # Use nmcli to configure the client wifi connection if it doesn't already exist
-        existing_connections = utils.run_cmd("sudo nmcli -t -f NAME connection show").split("\n")
+        existing_connections = set(utils.run_cmd("sudo nmcli -t -f NAME connection show").splitlines())
 
         # Inject the wifi clients
         for client in self.wifi_clients:
@@ -279,22 +317,54 @@ class DeviceManager:
             # grep did not match any lines
             logger.exception(f"{root_cfg.RAISE_WARN()}log_wifi_info threw an exception")
 
+    def ping(self, host: str, timeout: float) -> bool:
+        """Send one ICMP echo to host and report whether a reply arrived within timeout seconds.
+
+        Uses an unprivileged ICMP datagram socket (allowed by net.ipv4.ping_group_range) so that a check every
+        few seconds doesn't fork+exec /bin/ping. If the kernel doesn't allow that socket we fall back to the
+        ping command for the rest of the run.
+        """
+        if self._icmp_socket_available:
+            try:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            except OSError:
+                logger.info("Unprivileged ICMP sockets not permitted; using the ping command")
+                self._icmp_socket_available = False
+            else:
+                # A fresh socket per ping gets a fresh ICMP identifier from the kernel, so a late reply to an
+                # earlier ping can never be mistaken for this one.
+                with sock:
+                    deadline = monotonic() + timeout
+                    try:
+                        # Echo request: type 8, code 0. The kernel fills in the identifier and checksum.
+                        sock.sendto(_ICMP_ECHO_REQUEST, (host, 0))
+                        while (remaining := deadline - monotonic()) > 0:
+                            sock.settimeout(remaining)
+                            reply = sock.recv(1024)
+                            if reply and reply[0] == 0:  # Echo reply
+                                return True
+                    except OSError:  # Includes the timeout
+                        pass
+                    return False
+
+        # -c 1 means ping once, -W means timeout after the given number of seconds
+        return (
+            subprocess.run(
+                ["ping", "-c", "1", "-W", str(max(1, round(timeout))), host],
+                check=False,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            ).returncode
+            == 0
+        )
+
     # Function to manage the AP wifi connection
     # We only enable the AP wifi connection if the client wifi connection is UP
     def wifi_timer_callback(self) -> None:
         try:
             logger.debug("Wifi timer callback")
             # Test that internet connectivity is UP and working by pinging google DNS servers
-            # -c 1 means ping once, -W 1 means timeout after 1 second
-            ping_ok = (
-                subprocess.run(
-                    ["ping", "-c", "1", "-W", "1", "8.8.8.8"],
-                    check=False,
-                    stdout=subprocess.DEVNULL,
-                    stderr=subprocess.DEVNULL,
-                ).returncode
-                == 0
-            )
+            ping_ok = self.ping(_PING_HOST, timeout=1.0)
             # Even if ICMP ping works, we still see situation where TCP can be failed (router issue).
             # We can identify this by running ss -tpn and checking for connections in SYN_SENT state which
             # indicates that the TCP handshake is not completing.
@@ -349,18 +419,24 @@ class DeviceManager:
             f"(good/bad): {self.ping_success_count_all}/{self.ping_failure_count_all}"
         )
 
+        # Check at the full rate while connectivity is down; attempt_wifi_recovery counts failures in
+        # ping_check_interval ticks.
+        self.set_wifi_check_interval(self.ping_check_interval)
+
         # Set ping status so that the LEDs reflect this change
         self.set_ping_status(False)
 
         # Only check Wifi status if ping fails
         self.check_wifi_status()
 
-        if root_cfg.my_device.attempt_wifi_recovery:
+        if self.attempt_recovery:
             self.attempt_wifi_recovery()
 
     def check_wifi_status(self) -> None:
         # This returns eg "GNX103510:*:95" where * means connected
-        essid = utils.run_cmd("nmcli -g SSID,IN-USE,SIGNAL device wifi | grep '*'", ignore_errors=True)
+        essid = utils.run_cmd(
+            "nmcli -g SSID,IN-USE,SIGNAL device wifi", ignore_errors=True, grep_strs=[":*:"]
+        )
         if len(essid) > 3:
             self.set_wifi_status(True)
             logger.info(f"Wifi is up: {essid}")
@@ -382,6 +458,9 @@ class DeviceManager:
     # Try the first four recovery actions on a 20 minute cycle.
     # These recovery actions are attempted at 2, 4, 6, 8 minutes respectively into each 20 minute cycle.
     # If that doesn't recover it, then after the failure count gets to 4 hours reboot the device.
+    #
+    # The pauses between commands wait on _stop_event rather than sleeping, so stop() doesn't have to wait
+    # for them. The second command of a pair still runs so that we never leave the radio or interface down.
     ##########################################################################################################
     def attempt_wifi_recovery(self) -> None:
         retry_frequency = int(
@@ -395,21 +474,21 @@ class DeviceManager:
         elif self.ping_failure_count_run % retry_frequency == 10:
             logger.info("Restarting client wifi interface")
             utils.run_cmd("sudo nmcli dev disconnect " + self.client_wlan, ignore_errors=True)
-            sleep(1)
+            self._stop_event.wait(1)
             utils.run_cmd("sudo nmcli dev connect " + self.client_wlan, ignore_errors=True)
-            sleep(1)
+            self._stop_event.wait(1)
 
         elif self.ping_failure_count_run % retry_frequency == 20:
             logger.info("Toggle wifi radio")
             utils.run_cmd("sudo nmcli radio wifi off", ignore_errors=True)
-            sleep(1)
+            self._stop_event.wait(1)
             utils.run_cmd("sudo nmcli radio wifi on", ignore_errors=True)
-            sleep(1)
+            self._stop_event.wait(1)
 
         elif self.ping_failure_count_run % retry_frequency == 30:
             logger.info("Reloading NMCLI configuration")
             utils.run_cmd("sudo nmcli general reload", ignore_errors=True)
-            sleep(1)
+            self._stop_event.wait(1)
 
         elif self.ping_failure_count_run % retry_frequency == 40:
             logger.info("Explicitly connecting to wifi network")
@@ -422,12 +501,12 @@ class DeviceManager:
                         ignore_errors=True,
                     )
                     break
-            sleep(1)
+            self._stop_event.wait(1)
 
         elif self.ping_failure_count_run % retry_frequency == 50:
             logger.info("Restarting NetworkManager")
             utils.run_cmd("sudo systemctl restart NetworkManager", ignore_errors=True)
-            sleep(1)
+            self._stop_event.wait(1)
 
     def _get_wifi_connect_args(self, password: str) -> str:
         if password == "":
@@ -447,11 +526,25 @@ class DeviceManager:
                 f"(good/bad): {self.ping_success_count_all}/{self.ping_failure_count_all}"
             )
 
+        # While connectivity stays up, back off the check interval so that a healthy device isn't pinging
+        # every 10s all day. Any failure drops straight back to ping_check_interval.
+        if self.ping_success_count_run % PING_BACKOFF_AFTER_SUCCESSES == 0:
+            self.set_wifi_check_interval(min(self.wifi_check_interval * 2, MAX_WIFI_CHECK_INTERVAL))
+
         # Set ping status so that the LEDs reflect this change
         self.set_ping_status(True)
 
         self.last_ping_was_ok = True
 
+    def set_wifi_check_interval(self, interval: float) -> None:
+        """Change how often wifi_timer_callback runs; takes effect from the next scheduled call."""
+        if interval == self.wifi_check_interval:
+            return
+        logger.debug(f"Wifi check interval {self.wifi_check_interval}s -> {interval}s")
+        self.wifi_check_interval = interval
+        if self.wifi_timer is not None:
+            self.wifi_timer.interval = interval
+
     @staticmethod
     def diagnostics_upload_timer_callback() -> None:
         try:
@@ -1,7 +1,12 @@
 import gzip
 import os
+import shlex
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
+from time import monotonic
 
 from expidite_rpi.core import api, file_naming
 from expidite_rpi.core import configuration as root_cfg
@@ -45,6 +50,30 @@ DIAGNOSTIC_COMMANDS = [
     ("LED_STATUS_FILE", f"cat {root_cfg.LED_STATUS_FILE}"),
 ]
 
+# Minimum time between two diagnostics bundles.
+MIN_COLLECT_INTERVAL_SECONDS = 300
+
+# No new bundles are collected while DIAGS_DIR holds more than this many files.
+_MAX_DIAG_FILES = 10
+
+_BAR = "=" * 150 + "\n"
+# Kept small so that collecting diagnostics doesn't itself overload a struggling device.
+_MAX_PARALLEL_CMDS = 6
+_SHELL_METACHARS = frozenset("|;&<>$`*?")
+
+
+def _prepare_command(command: str) -> str | list[str]:
+    """Split command into an argv list so it can be run without a shell, unless it needs shell features
+    (pipes, command lists, redirection, expansion), in which case it is returned unchanged.
+    """
+    if _SHELL_METACHARS.isdisjoint(command):
+        return shlex.split(command)
+    return command
+
+
+# Parallel to DIAGNOSTIC_COMMANDS; prepared once at import rather than on every collection.
+_PREPARED_COMMANDS = [_prepare_command(command) for _, command in DIAGNOSTIC_COMMANDS]
+
 
 ##############################################################################################################
 # The sole purpose of this class is to write a diagnostics bundle to disk, containing as much information as
@@ -59,6 +88,12 @@ DIAGNOSTIC_COMMANDS = [
 # keeping this class self contained.
 ##############################################################################################################
 class DiagnosticsBundle:
+    # Monotonic time at which the last successful bundle collection started, used to debounce back-to-back
+    # failure paths (e.g. wifi recovery and a reboot) that would otherwise each write an almost identical
+    # bundle.
+    _last_collect_time: float | None = None
+    _collect_lock = threading.Lock()
+
     @staticmethod
     def collect(reason: str) -> None:
         """Collects and saves a diagnostics bundle to a time-stamped file."""
@@ -67,17 +102,39 @@ class DiagnosticsBundle:
 
         # Limit disk usage by limiting the number of files. If we have connectivity they should be getting
         # uploaded to cloud storage and then deleted. If not, then there isn't much value in keep storing for
-        # files.
-        if len(os.listdir(root_cfg.DIAGS_DIR)) > 10:
+        # files. We only need to know whether there are more than the limit, so stop reading the directory
+        # once we have counted that many.
+        with os.scandir(root_cfg.DIAGS_DIR) as entries:
+            too_many_files = sum(1 for _ in islice(entries, _MAX_DIAG_FILES + 1)) > _MAX_DIAG_FILES
+        if too_many_files:
             logger.info("Skip diagnostic collection because too many existing files")
             return
 
-        log_filename = file_naming.get_diags_filename()
+        with DiagnosticsBundle._collect_lock:
+            now = monotonic()
+            last = DiagnosticsBundle._last_collect_time
+            if last is not None and now - last < MIN_COLLECT_INTERVAL_SECONDS:
+                logger.info(f"Skip diagnostic collection ({reason}); last one started {now - last:.0f}s ago")
+                return
+            DiagnosticsBundle._last_collect_time = now
+
+        # The slot is claimed before the (slow) collection so that a concurrent caller is debounced, but a
+        # collection that fails hands it back so that the next failure path still gets its bundle.
+        try:
+            DiagnosticsBundle._write_bundle(file_naming.get_diags_filename(), reason)
+        except BaseException:
+            with DiagnosticsBundle._collect_lock:
+                if DiagnosticsBundle._last_collect_time == now:
+                    DiagnosticsBundle._last_collect_time = last
+            raise
 
+    @staticmethod
+    def _write_bundle(log_filename: Path, reason: str) -> None:
+        """Run the diagnostic commands and write the report to log_filename."""
         logger.info(f"Starting diagnostic collection to {log_filename}")
 
         def write_bar() -> None:
-            f.write("=" * 150 + "\n")
+            f.write(_BAR)
 
         with gzip.open(log_filename, "wt") as f:
             write_bar()
@@ -85,21 +142,14 @@ class DiagnosticsBundle:
             f.write(f"Reason:           {reason}\n")
             write_bar()
 
-            for title, command in DIAGNOSTIC_COMMANDS:
-                f.write(f"\n### {title} ({command}) ###\n")
-                stdout, stderr, returncode = DiagnosticsBundle._run_cmd(command)
-                f.write(f"Exit code: {returncode}\n")
-
-                if stdout:
-                    f.write("--- STDOUT ---\n")
-                    f.write(stdout + "\n")
-
-                if stderr:
-                    f.write("--- STDERR ---\n")
-                    f.write(stderr + "\n")
-
-                f.write("\n")
-                write_bar()
+            # The commands are independent and mostly spend their time waiting (ping alone takes ~4s), so run
+            # them concurrently. map() returns results in submission order, so the report order is unchanged.
+            with ThreadPoolExecutor(max_workers=_MAX_PARALLEL_CMDS, thread_name_prefix="diags") as pool:
+                results = pool.map(DiagnosticsBundle._run_cmd, _PREPARED_COMMANDS)
+                for (title, command), (stdout, stderr, returncode) in zip(
+                    DIAGNOSTIC_COMMANDS, results, strict=True
+                ):
+                    f.write(DiagnosticsBundle._format_cmd_output(title, command, stdout, stderr, returncode))
 
             expidite_version, user_code_version, python_version = root_cfg.get_version_info()
             f.write(f"\nExpidite version: {expidite_version}\n")
@@ -129,12 +179,27 @@ class DiagnosticsBundle:
         logger.info(f"Completed diagnostic collection to {log_filename}")
 
     @staticmethod
-    def _run_cmd(command: str) -> tuple[str, str, int]:
-        """Executes a shell command and returns its output and any errors."""
+    def _format_cmd_output(title: str, command: str, stdout: str, stderr: str, returncode: int) -> str:
+        """Format the output of one diagnostic command as a single block of report text."""
+        parts = [f"\n### {title} ({command}) ###\n", f"Exit code: {returncode}\n"]
+        if stdout:
+            parts.append(f"--- STDOUT ---\n{stdout}\n")
+        if stderr:
+            parts.append(f"--- STDERR ---\n{stderr}\n")
+        parts.append("\n")
+        parts.append(_BAR)
+        return "".join(parts)
+
+    @staticmethod
+    def _run_cmd(command: str | list[str]) -> tuple[str, str, int]:
+        """Executes a command and returns its output and any errors.
+
+        A string is run through the shell; a list is run directly as an argv.
+        """
         try:
             result = subprocess.run(
                 command,
-                shell=True,
+                shell=isinstance(command, str),
                 capture_output=True,
                 text=True,
                 timeout=15,  # Timeout in seconds, in case any command hangs.
@@ -143,6 +208,10 @@ class DiagnosticsBundle:
             return result.stdout.strip(), result.stderr.strip(), result.returncode
         except subprocess.TimeoutExpired:
             return "COMMAND TIMEOUT: Command exceeded 15 seconds.", "", 1
+        except FileNotFoundError as e:
+            # A list argv is exec'd directly, so a missing binary raises here rather than the shell reporting
+            # it; report it the way the shell would.
+            return "", f"{e.filename}: command not found", 127
         except Exception as e:
             return f"EXECUTION ERROR: {e}", "", 1
 
@@ -150,16 +219,14 @@ class DiagnosticsBundle:
     def upload() -> None:
         """Upload existing diagnostics bundles, if any, from disk to cloud storage."""
         try:
-            for filename in os.listdir(root_cfg.DIAGS_DIR):
-                if filename.endswith(".gz"):
-                    full_path = os.path.join(root_cfg.DIAGS_DIR, filename)
-
-                    if os.path.isfile(full_path):
-                        logger.info(f"Upload diagnostic bundle {filename}")
-                        cc = CloudConnector.get_instance(root_cfg.CLOUD_TYPE)
+            cc = CloudConnector.get_instance(root_cfg.CLOUD_TYPE)
+            with os.scandir(root_cfg.DIAGS_DIR) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".gz") and entry.is_file():
+                        logger.info(f"Upload diagnostic bundle {entry.name}")
                         cc.upload_to_container(
                             root_cfg.my_device.cc_for_diagnostics_bundles,
-                            [Path(full_path)],
+                            [Path(entry.path)],
                             delete_src=True,
                             storage_tier=api.StorageTier.COOL,
                         )
@@ -134,7 +134,7 @@ class DPnode:
         log_data = {}
         assert stream.fields is not None, f"fields must be set in {stream} if logging data"
         for field in stream.fields:
-            if field in api.REQD_RECORD_ID_FIELDS:
+            if field in api.REQD_RECORD_ID_FIELDS_SET:
                 continue
 
             if field in sensor_data:
@@ -583,7 +583,7 @@ class DPnode:
                 if (
                     (stream.fields is not None)
                     and (field not in stream.fields)
-                    and (field not in api.ALL_RECORD_ID_FIELDS)
+                    and (field not in api.ALL_RECORD_ID_FIELDS_SET)
                 ):
                     logger.warning(
                         f"{root_cfg.RAISE_WARN()}{field} in output from {data_id} "
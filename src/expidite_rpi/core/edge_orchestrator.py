@@ -67,6 +67,9 @@ class EdgeOrchestrator:
         logger.info(f"Initialising EdgeOrchestrator {self!r}")
 
         self._status = OrchestratorStatus.STOPPED
+        # Incremented whenever dp_trees is replaced, so that anything derived from it can be invalidated.
+        self.config_version = 0
+        self._sensor_index_map: dict[str, list[int]] | None = None
         self.reset_orchestrator_state()
 
         logger.info(f"Initialised EdgeOrchestrator {self!r}")
@@ -87,6 +90,7 @@ class EdgeOrchestrator:
             self._sensorThreads: list[Sensor] = []
             self._dpworkers: list[DPworker] = []
             self.dp_trees: list[DPtree] = []
+            self._bump_config_version()
 
             # We create a series of special Datastreams for recording:
             # HEART - device health
@@ -135,6 +139,25 @@ class EdgeOrchestrator:
     def get_status(self) -> OrchestratorStatus:
         return self._status
 
+    def _bump_config_version(self) -> None:
+        """Invalidate anything derived from dp_trees."""
+        self.config_version += 1
+        self._sensor_index_map = None
+
+    @property
+    def sensor_index_map(self) -> dict[str, list[int]]:
+        """Map of sensor type to the indices of the configured sensors of that type.
+
+        Built from dp_trees on first use and cached until the config is next loaded or reset.
+        """
+        if self._sensor_index_map is None:
+            sensors: dict[str, list[int]] = {}
+            for dptree in self.dp_trees:
+                sensor_cfg = dptree.sensor.config
+                sensors.setdefault(sensor_cfg.sensor_type.value, []).append(sensor_cfg.sensor_index)
+            self._sensor_index_map = sensors
+        return self._sensor_index_map
+
     def load_config(self) -> None:
         """Load the sensor and data processor config into the EdgeOrchestrator by calling
         the DeviceCfg.dp_trees_create_method().
@@ -142,6 +165,7 @@ class EdgeOrchestrator:
         self.dp_trees = self._safe_call_create_method(
             root_cfg.my_device.dp_trees_create_method, root_cfg.my_device.dp_trees_create_kwargs
         )
+        self._bump_config_version()
         for dptree in self.dp_trees:
             sensor = dptree.sensor
             if sensor in self._sensorThreads:
@@ -2,14 +2,22 @@
 # Description: This script is used to run the bcli command.
 ##############################################################################################################
 import ast
+import contextlib
 import datetime as dt
 import os
 import queue
+import select
+import shutil
+import signal
+import socket
 import subprocess
 import sys
+import tempfile
 import threading
 import time
+from collections.abc import Callable
 from datetime import timedelta
+from functools import partial
 from pathlib import Path
 
 import click
@@ -34,12 +42,110 @@ header = dash_line + "\n\n"
 ##############################################################################################################
 
 
+class _ShellSession:
+    """A long-lived bash process that runs short probe commands without a fork/exec of a new shell each time.
+
+    Each command is written to bash's stdin followed by an echo of a sentinel carrying the exit code; output
+    is read back until the sentinel is seen. Commands get /dev/null as stdin so they can't consume the
+    commands queued behind them, and stderr is discarded so it can't interleave with the sentinel line. The
+    shell is (re)started lazily, so a command that kills it only costs a restart on the next call; a command
+    that hangs past _READ_TIMEOUT_SECONDS gets the session's process group killed.
+    """
+
+    _SENTINEL = "__BCLI_END__"
+    _READ_TIMEOUT_SECONDS = 30.0
+
+    def __init__(self) -> None:
+        self._proc: subprocess.Popen[bytes] | None = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> subprocess.Popen[bytes]:
+        if self._proc is None or self._proc.poll() is not None:
+            # start_new_session gives bash its own process group, so a hung probe can be killed with it.
+            self._proc = subprocess.Popen(
+                ["bash"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+        return self._proc
+
+    def _kill(self) -> None:
+        if self._proc is not None:
+            with contextlib.suppress(ProcessLookupError, PermissionError):
+                os.killpg(self._proc.pid, signal.SIGKILL)
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                self._proc.wait(timeout=5)
+            self._proc = None
+
+    def run(self, cmd: str) -> str:
+        """Run cmd in the session and return its output, or "" if it exits non-zero (as utils.run_cmd does
+        with ignore_errors=True).
+        """
+        with self._lock:
+            proc = self._start()
+            assert proc.stdin is not None
+            assert proc.stdout is not None
+            proc.stdin.write(f"{{ {cmd}\n}} < /dev/null; printf '\\n{self._SENTINEL}%s\\n' $?\n".encode())
+            proc.stdin.flush()
+            # Read the raw fd rather than readline() so that select() can bound the wait.
+            fd = proc.stdout.fileno()
+            deadline = time.monotonic() + self._READ_TIMEOUT_SECONDS
+            buf = b""
+            lines: list[str] = []
+            while True:
+                line, sep, rest = buf.partition(b"\n")
+                if not sep:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                        self._kill()
+                        msg = f"Command timed out after {self._READ_TIMEOUT_SECONDS}s and was killed: {cmd}"
+                        raise TimeoutError(msg)
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        self._proc = None
+                        msg = f"Shell session exited while running: {cmd}"
+                        raise RuntimeError(msg)
+                    buf += chunk
+                    continue
+                buf = rest
+                text = line.decode("utf-8", errors="replace")
+                if text.startswith(self._SENTINEL):
+                    returncode = int(text.removeprefix(self._SENTINEL))
+                    break
+                lines.append(text)
+
+        if returncode != 0:
+            logger.info(f"Ignoring failure running command: {cmd} Output: {lines}")
+            return ""
+        return "\n".join(lines).strip()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._proc is not None and self._proc.poll() is None:
+                if self._proc.stdin is not None:
+                    self._proc.stdin.close()
+                try:
+                    self._proc.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self._proc.kill()
+            self._proc = None
+
+
+# Shell session shared by run_cmd while the interactive menu is open.
+_shell_session: _ShellSession | None = None
+
+
 # Wrapper for utils.run_cmd so that we can display error rather than throwing an exception
 def run_cmd(cmd: str) -> str:
     """Run a command and return its output or an error message."""
     if not root_cfg.running_on_rpi:
         return "This command only works on a Raspberry Pi"
     try:
+        # In test mode utils.run_cmd routes to the RpiEmulator stub, so the session is bypassed.
+        if _shell_session is not None and root_cfg.ST_MODE != root_cfg.SOFTWARE_TEST_MODE.TESTING:
+            return _shell_session.run(cmd)
         return utils.run_cmd(cmd, ignore_errors=True)
     except Exception as e:
         return f"Error: {e}"
@@ -90,6 +196,70 @@ def run_cmd_live_echo(cmd: str) -> str:
     return "Command executed successfully."
 
 
+# Cached (monotonic time, IP) from the last _local_ip lookup.
+_LOCAL_IP_TTL_S = 60.0
+_local_ip_cache: tuple[float, str] | None = None
+
+
+def _local_ip() -> str:
+    """Return this device's primary IPv4 address, or "" if it can't be determined.
+
+    Connecting a UDP socket sends no packets but makes the kernel pick the outbound interface, so this avoids
+    spawning `hostname -I`. The result is cached briefly since it rarely changes between menu invocations.
+    """
+    global _local_ip_cache
+    now = time.monotonic()
+    if _local_ip_cache is not None and now - _local_ip_cache[0] < _LOCAL_IP_TTL_S:
+        return _local_ip_cache[1]
+
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            ip = str(s.getsockname()[0])
+    except OSError:
+        # No route out (e.g. no default gateway); fall back to whatever hostname reports.
+        addresses = run_cmd("hostname -I").split()
+        ip = addresses[0] if addresses else ""
+    _local_ip_cache = (now, ip)
+    return ip
+
+
+def _parse_i2cdetect(output: str) -> frozenset[int]:
+    """Return the addresses reported as present in `i2cdetect -y` table output.
+
+    Rows look like "40: -- -- -- -- 44 -- ...", where each detected device's cell holds its full address in
+    hex. Empty, "--" and "UU" cells are not counted, and the column header line is skipped.
+    """
+    present: set[int] = set()
+    for line in output.splitlines():
+        _, sep, cells = line.partition(":")
+        if not sep:
+            continue
+        for cell in cells.split():
+            try:
+                present.add(int(cell, 16))
+            except ValueError:
+                continue
+    return frozenset(present)
+
+
+def _prompt_int(msg: str, default: int = 0) -> int | None:
+    """Prompt for a menu choice, returning default on empty input or None if the input isn't a number.
+
+    Menu choices are small integers, so this is plain input() + int() rather than click's prompt machinery.
+    """
+    try:
+        raw = input(f"{msg} [{default}]: ").strip()
+    except EOFError:
+        raise click.exceptions.Abort from None
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return None
+
+
 def _parse_log_dict(log_dict_str: str) -> dict:
     """Parse a dictionary embedded in telemetry logs.
 
@@ -123,6 +293,10 @@ def _parse_log_dict_with_fallback(log_dict_str: str) -> dict:
         raise ValueError(msg) from err
 
 
+# A menu maps each choice number to its displayed label and the action to run.
+MenuTable = dict[int, tuple[str, Callable[[], None]]]
+
+
 class InteractiveMenu:
     """Interactive menu for navigating commands."""
 
@@ -133,6 +307,41 @@ class InteractiveMenu:
         if inventory:
             self.sc.configure(inventory)
 
+        # Menu tables: choice number -> (label, action). Choice 0 (exit / back) is handled by _run_menu.
+        self._main_menu: MenuTable = {
+            1: ("View Config", self.view_rpi_core_config),
+            2: ("View Status", self.view_status),
+            3: ("Validate device", self.validate_device),
+            4: ("Sensing Commands", self.sensing_menu),
+            5: ("Maintenance Commands", self.maintenance_menu),
+            6: ("Debug Commands", self.debug_menu),
+        }
+        self._sensing_menu: MenuTable = {
+            1: ("Trigger sensing operation now", self.trigger_sensing),
+        }
+        self._debug_menu: MenuTable = {
+            1: ("Run Network Test", self.run_network_test),
+            2: ("Display logs live (journalctl)", self.journalctl),
+            3: ("Display errors", self.display_errors),
+            4: ("Display all expidite logs", self.display_rpi_core_logs),
+            5: ("Display sensor measurement logs", self.display_sensor_logs),
+            6: ("Display SCORE sensor activity logs", self.display_score_logs),
+            7: ("Display running processes", self.display_running_processes),
+            8: ("Show recordings and data files", self.show_recordings),
+            9: ("Show Crontab Entries", self.show_crontab_entries),
+            10: ("nmap ping scan of local network", self.nmap_ping_scan),
+        }
+        self._maintenance_menu: MenuTable = {
+            1: ("Update Software", self.update_software),
+            2: ("Enable rpi-connect", self.enable_rpi_connect),
+            3: ("Review mode", self.review_mode),
+            4: ("Start RpiCore", self.start_rpi_core),
+            5: ("Stop RpiCore (graceful stop)", partial(self.stop_rpi_core, pkill=False)),
+            6: ("Hard stop RpiCore (pkill)", partial(self.stop_rpi_core, pkill=True)),
+            7: ("Reboot the Device", self.reboot_device),
+            8: ("Update storage key", self.update_storage_key),
+        }
+
     ##########################################################################################################
     # Main menu functions
     ##########################################################################################################
@@ -156,7 +365,8 @@ class InteractiveMenu:
         click.echo("# Sensors & datastreams")
         click.echo(f"{dash_line}\n")
         orchestrator = EdgeOrchestrator.get_instance()
-        orchestrator.load_config()
+        if not orchestrator.dp_trees:
+            orchestrator.load_config()
         for i, dptree in enumerate(orchestrator.dp_trees):
             sensor_cfg = dptree.sensor.config
             click.echo(f"{i}> {sensor_cfg.sensor_type} {sensor_cfg.sensor_index}  {sensor_cfg.sensor_model}")
@@ -169,7 +379,7 @@ class InteractiveMenu:
         if root_cfg.system_cfg:
             click.echo(f"\n{dash_line}")
             click.echo("# SYSTEM CONFIGURATION")
-            click.echo(f"{dash_line}")
+            click.echo(dash_line)
             expidite_version, user_code_version, python_version = root_cfg.get_version_info()
             click.echo(f"Expidite version: {expidite_version}")
             click.echo(f"User code version: {user_code_version}")
@@ -183,7 +393,7 @@ class InteractiveMenu:
 
         click.echo(f"\n{dash_line}")
         click.echo("# EXPIDITE CONFIGURATION")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo(f"{self.sc.display_configuration()}")
 
     ##########################################################################################################
@@ -192,7 +402,7 @@ class InteractiveMenu:
     def trigger_sensing(self) -> None:
         """Trigger sensing on all sensors by setting the sensor flag."""
         # Need to ask for input on duration of recording in seconds
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# TRIGGER SENSING ON ALL SENSORS")
         click.echo("Note: this will have no effect if sensors are already recording continuously.\n")
         duration = click.prompt("Enter duration of recording in whole seconds", type=int, default=60)
@@ -265,29 +475,35 @@ class InteractiveMenu:
             click.echo("This command only works on Linux. Exiting...")
             return
         click.echo("\n")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# ERROR LOGS")
         click.echo("# Displaying error logs from the last 4 hours")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         since_time = api.utc_now() - timedelta(hours=4)
         logs = device_health.get_logs(since=since_time, min_priority=4)
         self.display_logs(logs)
         # Cross check with simple journalctl command
         click.echo("\n")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# ERROR LOGS (journalctl grep check)")
-        click.echo(f"{dash_line}")
-        utils.run_cmd("journalctl", ignore_errors=True, grep_strs=["error"])
+        click.echo(dash_line)
+        # Let journalctl do the filtering so only matching lines come back through the pipe.
+        click.echo(
+            run_cmd(
+                "journalctl --no-pager --case-sensitive=true --grep=error "
+                f"--since='{since_time.strftime('%Y-%m-%d %H:%M:%S')} UTC'"
+            )
+        )
 
     def display_rpi_core_logs(self) -> None:
         """Display regular rpi_core logs."""
         if root_cfg.running_on_windows:
             click.echo("This command only works on Linux. Exiting...")
             return
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# Expidite logs")
         click.echo("# Displaying expidite logs for the last 15 minutes")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         since_time = api.utc_now() - timedelta(minutes=15)
         logs = device_health.get_logs(since=since_time, min_priority=6, grep_str=["expidite"])
         self.display_logs(logs)
@@ -296,10 +512,10 @@ class InteractiveMenu:
         if root_cfg.running_on_windows:
             click.echo("This command only works on Linux. Exiting...")
             return
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# Sensor logs")
         click.echo("# Displaying sensor output logs (last 30 minutes)")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         since_time = api.utc_now() - timedelta(minutes=30)
         logs = device_health.get_logs(
             since=since_time, min_priority=6, grep_str=[api.TELEM_TAG, "Save log: "]
@@ -340,7 +556,7 @@ class InteractiveMenu:
             return
         click.echo(f"\n{dash_line}")
         click.echo("# Expidite SCORE logs of sensor output (last 15 minutes)")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         since_time = api.utc_now() - timedelta(minutes=15)
         logs = device_health.get_logs(
             since=since_time, min_priority=6, grep_str=[api.TELEM_TAG, "Save log: ", "SCORE"]
@@ -371,24 +587,22 @@ class InteractiveMenu:
     def display_running_processes(self) -> None:
         # Running processes.
         # Drop any starting / or . characters.
-        # And convert the process list to a simple comma-separated string with no {} or ' or " characters.
+        # And convert the process list to a simple, sorted, comma-separated string.
         if not root_cfg.system_cfg.is_valid:
             click.echo("System.cfg is not set. Please check your installation.")
             return
         process_set = utils.check_running_processes(search_string=f"{root_cfg.system_cfg.my_start_script}")
-        process_list_str = (
-            str(process_set).replace("{", "").replace("}", "").replace("'", "").replace('"', "").strip()
-        )
-        click.echo(f"{dash_line}")
+        process_list_str = ", ".join(sorted(process_set))
+        click.echo(dash_line)
         click.echo("# Display running RpiCore processes")
         click.echo(f"{dash_line}\n")
         click.echo(f"{process_list_str}\n")
 
     def show_recordings(self) -> None:
         # List all files under the root_working_dir
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# RpiCore recordings")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("Recording files:")
         click.echo(run_cmd(f"ls -lhR {root_cfg.ROOT_WORKING_DIR}*"))
         click.echo("\n")
@@ -566,7 +780,7 @@ class InteractiveMenu:
         Review mode is set via the BCLI. The BCLI also helps the user understand how to see the output from
         the sensors in review mode.
         """
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# REVIEW MODE")
         click.echo("The intent of review mode is to help with manual review of sensor data.")
         click.echo("For example, the video sensor saves images to the cloud every few seconds so that")
@@ -613,7 +827,7 @@ class InteractiveMenu:
 
     def show_crontab_entries(self) -> None:
         """Display the crontab entries for the user."""
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# CRONTAB ENTRIES")
         click.echo(f"{dash_line}\n")
         if not root_cfg.running_on_rpi:
@@ -674,45 +888,50 @@ class InteractiveMenu:
                     else:
                         existing_lines.append(line)
 
+        # Write the new keys to a temporary file alongside the keys file, so that it can be atomically
+        # swapped in with os.replace once it has been tested; there is never a moment with no keys file.
+        with tempfile.NamedTemporaryFile(
+            "w", dir=root_cfg.KEYS_FILE.parent, suffix=".test", delete=False
+        ) as tmp:
+            tmp.write("".join(existing_lines))
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        test_file = Path(tmp.name)
+
         # Check the key is valid by trying to create a CloudConnector instance.
         try:
-            test_file = root_cfg.KEYS_FILE.with_suffix(".test")
-            if test_file.exists():
-                test_file.unlink()
-
-            with open(test_file, "w") as f:
-                for line in existing_lines:
-                    f.write(line)
-
             cc = CloudConnector.get_instance(root_cfg.CloudType.AZURE)
             cc.set_keys(keys_file=test_file)
             cc.list_cloud_files(root_cfg.my_device.cc_for_fair)
             click.echo("Storage key test passed.")
         except Exception as e:
             click.echo(f"Storage key test failed: {e}")
-            if test_file.exists():
-                test_file.unlink()
+            test_file.unlink(missing_ok=True)
             return
 
         # Backup and replace.
-        click.echo(f"Saving old file as {root_cfg.KEYS_FILE.with_suffix('.bak')}")
         if root_cfg.KEYS_FILE.exists():
-            root_cfg.KEYS_FILE.rename(root_cfg.KEYS_FILE.with_suffix(".bak"))
+            click.echo(f"Saving old file as {root_cfg.KEYS_FILE.with_suffix('.bak')}")
+            shutil.copy2(root_cfg.KEYS_FILE, root_cfg.KEYS_FILE.with_suffix(".bak"))
         click.echo(f"Updating the storage key in {root_cfg.KEYS_FILE}")
-        test_file.rename(root_cfg.KEYS_FILE)
+        os.replace(test_file, root_cfg.KEYS_FILE)
 
     def nmap_ping_scan(self) -> None:
         """Run an nmap ping scan of the local network."""
-        # Check if nmap is installed
-        if run_cmd("which nmap").strip() == "":
+        # Check if nmap is installed. `command -v` is a shell builtin, so this doesn't exec anything in the
+        # shell session. Only re-check after an install attempt.
+        if run_cmd("command -v nmap") == "":
             click.echo("nmap is not installed. Installing...")
-            run_cmd_live_echo("sudo apt-get update && sudo apt-get install -y nmap")
-            if run_cmd("which nmap").strip() == "":
+            run_cmd_live_echo("sudo sh -c 'apt-get update && apt-get install -y nmap'")
+            if run_cmd("command -v nmap") == "":
                 click.echo("nmap installation failed. Exiting...")
                 return
         click.echo("Running nmap ping scan of local network...")
         # Get the local IP address and subnet mask
-        local_ip = run_cmd("hostname -I").strip().split()[0]
+        local_ip = _local_ip()
+        if not local_ip:
+            click.echo("Unable to determine the local IP address. Exiting...")
+            return
         # Run as root in order to get MAC addresses
         output = run_cmd_live_echo(f"sudo nmap -sn {local_ip}/24")
         click.echo("Nmap ping scan completed.")
@@ -725,9 +944,9 @@ class InteractiveMenu:
     ##########################################################################################################
     def validate_device(self) -> None:
         """Validate the device by running a series of tests."""
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# VALIDATE DEVICE")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
 
         success = True
 
@@ -748,12 +967,11 @@ class InteractiveMenu:
                     success = False
 
             # Check that the devices configured are working
-            sensors: dict[str, list[int]] = {}
+            # The config can't change while bcli is running, so only load it the first time.
             orchestrator = EdgeOrchestrator.get_instance()
-            orchestrator.load_config()
-            for _i, dptree in enumerate(orchestrator.dp_trees):
-                sensor_cfg = dptree.sensor.config
-                sensors.setdefault(sensor_cfg.sensor_type.value, []).append(sensor_cfg.sensor_index)
+            if not orchestrator.dp_trees:
+                orchestrator.load_config()
+            sensors = orchestrator.sensor_index_map
             if sensors:
                 click.echo("\nSensors configured:")
                 for sensor_type, indices in sensors.items():
@@ -780,9 +998,14 @@ class InteractiveMenu:
                 click.echo(run_cmd("lsusb"))
 
                 # Assume all USB devices are microphones
-                sound_test = run_cmd("find /sys/devices/ -name id | grep usb | grep sound")
-                # Count the number of instances of "sound" in the output
-                sound_count = sound_test.count("sound")
+                # Let find do the path filtering itself rather than piping through two greps. find exits
+                # non-zero if any sysfs entry is unreadable, which would make run_cmd discard the matches it
+                # did print, so the count is taken from the output alone.
+                sound_test = run_cmd(
+                    "find /sys/devices/ -path '*usb*' -path '*sound*' -name id 2>/dev/null || true"
+                )
+                # One line per USB sound device
+                sound_count = len(sound_test.splitlines())
                 if sound_count == num_usb_devices:
                     click.echo("\nFound the correct number of USB audio device(s).")
                     click.echo(sound_test)
@@ -797,10 +1020,11 @@ class InteractiveMenu:
                 click.echo(f"\nI2C devices expected for indices: {sensors[api.SENSOR_TYPE.I2C.value]}")
                 i2c_indexes = sensors[api.SENSOR_TYPE.I2C.value]
                 i2c_test_result = run_cmd("i2cdetect -y 1")
+                i2c_present = _parse_i2cdetect(i2c_test_result)
                 for index in i2c_indexes:
                     # We need to convert the index from base10 to base16
                     hex_index = f"{index:X}"
-                    if str(hex_index) in i2c_test_result:
+                    if index in i2c_present:
                         click.echo(f"I2C device {index} ({hex_index}) is working.")
                     else:
                         click.echo(f"ERROR: I2C device {index} ({hex_index}) not found.")
@@ -836,13 +1060,13 @@ class InteractiveMenu:
             f.write("green:blink:0.25")  # Flash green
             time.sleep(2)
 
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
 
     def run_network_test(self) -> None:
         """Run a network test and display the results."""
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo("# NETWORK INFO")
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         if not root_cfg.running_on_rpi:
             click.echo("This command only works on a Raspberry Pi")
             return
@@ -869,157 +1093,52 @@ class InteractiveMenu:
         check_if_setup_required()
 
         # Display status
-        click.echo(f"{dash_line}")
+        click.echo(dash_line)
         click.echo(f"# Expidite CLI on {root_cfg.my_device_id} {root_cfg.my_device.name}")
-        while True:
-            click.echo(f"{header}Main Menu:")
-            click.echo("0. Exit")
-            click.echo("1. View Config")
-            click.echo("2. View Status")
-            click.echo("3. Validate device")
-            click.echo("4. Sensing Commands")
-            click.echo("5. Maintenance Commands")
-            click.echo("6. Debug Commands")
-            try:
-                choice = click.prompt("\nEnter your choice", type=int, default=0)
-                click.echo("\n")
-            except ValueError:
-                click.echo("Invalid input. Please enter a number.")
-                continue
-
-            match choice:
-                case 1:
-                    self.view_rpi_core_config()
-                case 2:
-                    self.view_status()
-                case 3:
-                    self.validate_device()
-                case 4:
-                    self.sensing_menu()
-                case 5:
-                    self.maintenance_menu()
-                case 6:
-                    self.debug_menu()
-                case 0:
-                    click.echo("Exiting...")
-                    break
-                case _:
-                    click.echo("Invalid choice. Please try again.")
+        self._run_menu("Main Menu", "Exit", self._main_menu)
+        click.echo("Exiting...")
 
     def sensing_menu(self) -> None:
         """Menu for sensing commands."""
-        while True:
-            click.echo(f"{header}Sensing Menu:")
-            click.echo("0. Back to Main Menu")
-            click.echo("1. Trigger sensing operation now")
-            try:
-                choice = click.prompt("\nEnter your choice", type=int, default=0)
-                click.echo("\n")
-            except ValueError:
-                click.echo("Invalid input. Please enter a number.")
-                continue
-
-            match choice:
-                case 1:
-                    self.trigger_sensing()
-                case 0:
-                    break
-                case _:
-                    click.echo("Invalid choice. Please try again.")
+        self._run_menu("Sensing Menu", "Back to Main Menu", self._sensing_menu)
 
     def debug_menu(self) -> None:
         """Menu for debugging commands."""
-        while True:
-            click.echo(f"{header}Debug Menu:")
-            click.echo("0. Back to Main Menu")
-            click.echo("1. Run Network Test")
-            click.echo("2. Display logs live (journalctl)")
-            click.echo("3. Display errors")
-            click.echo("4. Display all expidite logs")
-            click.echo("5. Display sensor measurement logs")
-            click.echo("6. Display SCORE sensor activity logs")
-            click.echo("7. Display running processes")
-            click.echo("8. Show recordings and data files")
-            click.echo("9. Show Crontab Entries")
-            click.echo("10. nmap ping scan of local network")
-            try:
-                choice = click.prompt(
-                    "\nEnter your choice",
-                    type=int,
-                    default=0,
-                )
-                click.echo("\n")
-            except ValueError:
-                click.echo("Invalid input. Please enter a number.")
-                continue
-
-            match choice:
-                case 1:
-                    self.run_network_test()
-                case 2:
-                    self.journalctl()
-                case 3:
-                    self.display_errors()
-                case 4:
-                    self.display_rpi_core_logs()
-                case 5:
-                    self.display_sensor_logs()
-                case 6:
-                    self.display_score_logs()
-                case 7:
-                    self.display_running_processes()
-                case 8:
-                    self.show_recordings()
-                case 9:
-                    self.show_crontab_entries()
-                case 10:
-                    self.nmap_ping_scan()
-                case 0:
-                    break
-                case _:
-                    click.echo("Invalid choice. Please try again.")
+        self._run_menu("Debug Menu", "Back to Main Menu", self._debug_menu)
 
     def maintenance_menu(self) -> None:
         """Menu for maintenance commands."""
+        self._run_menu("Maintenance Menu", "Back to Main Menu", self._maintenance_menu)
+
+    @staticmethod
+    def _run_menu(title: str, exit_label: str, menu: MenuTable) -> None:
+        """Display a menu and dispatch the user's choices until they pick 0.
+
+        The same table drives both the displayed options and the dispatch.
+        """
+        # The menu text doesn't change between iterations, so build it once.
+        menu_text = "\n".join(
+            [
+                f"{header}{title}:",
+                f"0. {exit_label}",
+                *(f"{key}. {label}" for key, (label, _) in menu.items()),
+            ]
+        )
         while True:
-            click.echo(f"{header}Maintenance Menu:")
-            click.echo("0. Back to Main Menu")
-            click.echo("1. Update Software")
-            click.echo("2. Enable rpi-connect")
-            click.echo("3. Review mode")
-            click.echo("4. Start RpiCore")
-            click.echo("5. Stop RpiCore (graceful stop)")
-            click.echo("6. Hard stop RpiCore (pkill)")
-            click.echo("7. Reboot the Device")
-            click.echo("8. Update storage key")
-            try:
-                choice = click.prompt("\nEnter your choice", type=int, default=0)
-                click.echo("\n")
-            except ValueError:
+            click.echo(menu_text)
+            choice = _prompt_int("\nEnter your choice")
+            click.echo("\n")
+            if choice is None:
                 click.echo("Invalid input. Please enter a number.")
                 continue
+            if choice == 0:
+                break
 
-            match choice:
-                case 1:
-                    self.update_software()
-                case 2:
-                    self.enable_rpi_connect()
-                case 3:
-                    self.review_mode()
-                case 4:
-                    self.start_rpi_core()
-                case 5:
-                    self.stop_rpi_core(pkill=False)
-                case 6:
-                    self.stop_rpi_core(pkill=True)
-                case 7:
-                    self.reboot_device()
-                case 8:
-                    self.update_storage_key()
-                case 0:
-                    break
-                case _:
-                    click.echo("Invalid choice. Please try again.")
+            entry = menu.get(choice)
+            if entry is None:
+                click.echo("Invalid choice. Please try again.")
+                continue
+            entry[1]()
 
 
 ##############################################################################################################
@@ -1027,9 +1146,13 @@ class InteractiveMenu:
 # Main just calls the interactive menu
 ##############################################################################################################
 def main() -> None:
+    global _shell_session
+
     # Disable console logging during CLI execution
     with disable_console_logging("expidite"):
         try:
+            if root_cfg.running_on_rpi:
+                _shell_session = _ShellSession()
             im = InteractiveMenu()
             im.interactive_menu()
         except (KeyboardInterrupt, click.exceptions.Abort):
@@ -1038,6 +1161,9 @@ def main() -> None:
             logger.exception("Error in CLI")
             click.echo(f"Error in CLI: {e}")
         finally:
+            if _shell_session is not None:
+                _shell_session.close()
+                _shell_session = None
             CloudConnector.shutdown_instance()
             click.echo("Done")
 
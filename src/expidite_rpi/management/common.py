@@ -18,7 +18,7 @@ def check_keys_env() -> bool:
     if success:
         return True
 
-    click.echo(f"{DASH_LINE}")
+    click.echo(DASH_LINE)
     click.echo(f"# {error}")
     click.echo("# ")
     click.echo(f"# Create a file called {root_cfg.KEYS_FILE} in {root_cfg.CFG_DIR}.")
@@ -35,7 +35,7 @@ def check_keys_env() -> bool:
     click.echo("# ")
     click.echo("# Press any key to continue once you have done so")
     click.echo("# ")
-    click.echo(f"{DASH_LINE}")
+    click.echo(DASH_LINE)
     return False
 
 
@@ -43,7 +43,7 @@ def check_device_in_inventory() -> None:
     """Check if this device's ID is found in the fleet configuration inventory."""
     try:
         if root_cfg.my_device_id not in root_cfg.INVENTORY:
-            click.echo(f"{DASH_LINE}")
+            click.echo(DASH_LINE)
             click.echo("# DEVICE NOT FOUND IN INVENTORY")
             click.echo("# ")
             click.echo(
@@ -69,7 +69,7 @@ def check_device_in_inventory() -> None:
             click.echo("# You can continue to use the CLI for maintenance and debugging,")
             click.echo("# but RpiCore will not start properly until this device is configured.")
             click.echo("# ")
-            click.echo(f"{DASH_LINE}")
+            click.echo(DASH_LINE)
     except Exception as e:
         logger.debug(f"Error checking device inventory: {e}")
 
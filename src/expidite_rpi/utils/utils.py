@@ -10,6 +10,7 @@ import subprocess
 from datetime import UTC
 from pathlib import Path
 from threading import Timer
+from time import monotonic
 
 import psutil
 
@@ -229,8 +230,23 @@ def run_video_cmd(
 # Timer class that repeats
 ##############################################################################################################
 class RepeatTimer(Timer):
+    """A Timer that calls function every interval seconds until cancelled.
+
+    Calls are scheduled against a monotonic deadline, so the time the function takes doesn't add drift. A call
+    that overruns its slot is followed straight away by the next one and the schedule restarts from there,
+    rather than firing a burst of catch-up calls; calls never overlap.
+    """
+
     def run(self) -> None:
-        while not self.finished.wait(self.interval):
+        deadline = monotonic()
+        while True:
+            deadline += self.interval
+            delay = deadline - monotonic()
+            if delay <= 0:
+                deadline = monotonic()
+                delay = 0
+            if self.finished.wait(delay):
+                break
             self.function(*self.args, **self.kwargs)
 
 
@@ -284,6 +300,14 @@ def is_already_running(process_name: str) -> bool:
 # It builds up a set of the module strings, discarding duplicates
 ##############################################################################################################
 def check_running_processes(search_string: str = "core") -> set:
+    return check_running_processes_multi([search_string])
+
+
+def check_running_processes_multi(search_strings: list[str]) -> set:
+    """Return the command line segments of running processes that contain any of the search strings.
+
+    Equivalent to the union of check_running_processes() for each string, but walks the process table once.
+    """
     if root_cfg.running_on_windows:
         logger.warning("check_running_processes not supported on Windows")
         return set()
@@ -294,9 +318,9 @@ def check_running_processes(search_string: str = "core") -> set:
             for line in proc.cmdline():
                 # Parse the line into the space-separated segments
                 segments = line.split(" ")
-                # Find the segment that contains the search string
+                # Find the segments that contain any of the search strings
                 for segment in segments:
-                    if search_string in segment:
+                    if any(search_string in segment for search_string in search_strings):
                         processes.add(segment)
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             pass
@@ -6,6 +6,7 @@ import subprocess
 from collections.abc import Generator
 from contextlib import contextmanager
 from dataclasses import fields, is_dataclass
+from functools import cache
 from pathlib import Path
 from typing import Any
 
@@ -37,6 +38,12 @@ def create_root_working_dir(path: Path) -> None:
 ##############################################################################################################
 # Dataclass display utility
 ##############################################################################################################
+@cache
+def dataclass_field_names(cls: type) -> tuple[str, ...]:
+    """Return the field names of a dataclass type in definition order, computed once per type."""
+    return tuple([f.name for f in fields(cls)])
+
+
 def display_dataclass(obj: Any, indent: int = 0) -> str:  # noqa: ANN401
     """Recursively display the contents of a dataclass hierarchy.
 
@@ -67,28 +74,28 @@ def display_dataclass(obj: Any, indent: int = 0) -> str:  # noqa: ANN401
 
     result = ""
 
-    for field in fields(obj):
-        value = getattr(obj, field.name)
+    for name in dataclass_field_names(obj if isinstance(obj, type) else type(obj)):
+        value = getattr(obj, name)
         if value is None:
             # Skip empty fields
             continue
 
         if is_dataclass(value):
             # Recursively display nested dataclass
-            result += f"{fb(indent)}{field.name}::\n{display_dataclass(value, indent + 1)}{nlb(indent)}\n"
+            result += f"{fb(indent)}{name}::\n{display_dataclass(value, indent + 1)}{nlb(indent)}\n"
         elif isinstance(value, list) and all(isinstance(item, str | float | int) for item in value):
             # Treat lists of simple types as a single block
-            result += f"{fb(indent)}{field.name}={value}{bb(indent)}\n"
+            result += f"{fb(indent)}{name}={value}{bb(indent)}\n"
         elif isinstance(value, list):
             # Handle lists, including lists of dataclasses
-            result += f"{fb(indent)}{field.name}::\n"
+            result += f"{fb(indent)}{name}::\n"
             for i, item in enumerate(value):
                 result += f"{id(indent + 1)}[{i}]\n"
                 result += f"{display_dataclass(item, indent + 2)}"
             result += f"{nlb(indent)}\n"
         else:
             # Display simple fields
-            result += f"{fb(indent)}{field.name}={value!r}{bb(indent)}\n"
+            result += f"{fb(indent)}{name}={value!r}{bb(indent)}\n"
     return result
 
 
@@ -84,14 +84,8 @@ def pytest_runtest_makereport(item, call):
 @pytest.fixture(autouse=True)
 def shutdown_cloud_connector():
     yield
-    # Ensure CloudConnector is properly shut down after each test
-    try:
-        cc = CloudConnector.get_instance(root_cfg.CloudType.AZURE)
-        cc.shutdown()
-        time.sleep(1)
-    except Exception:
-        # Ignore errors if connector was never created
-        pass
+    # Ensure CloudConnectors are properly shut down after each test
+    CloudConnector.shutdown_instance()
 
 
 @pytest.fixture
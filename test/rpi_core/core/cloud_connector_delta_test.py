@@ -8,9 +8,10 @@ blob being appended to mid-download, without falling back to a full re-download.
 
 from pathlib import Path
 from types import SimpleNamespace
-from typing import cast
+from typing import BinaryIO, cast
 
 import pytest
+from azure.core.exceptions import ServiceRequestError
 from azure.storage.blob import BlobClient
 
 from expidite_rpi.core.cloud_connector import CloudConnector
@@ -24,6 +25,9 @@ class _FakeDownloadStream:
     def readall(self) -> bytes:
         return self._data
 
+    def readinto(self, stream: BinaryIO) -> int:
+        return stream.write(self._data)
+
 
 class _FakeBlobClient:
     """In-memory stand-in for an Azure BlobClient.
@@ -45,7 +49,10 @@ class _FakeBlobClient:
         self.properties_reads += 1
         return SimpleNamespace(size=len(self.content), etag="etag-0")
 
-    def download_blob(self, offset: int = 0, length: int | None = None) -> _FakeDownloadStream:
+    def download_blob(
+        self, offset: int = 0, length: int | None = None, max_concurrency: int = 1
+    ) -> _FakeDownloadStream:
+        del max_concurrency  # unused; the fake transfers in one piece
         if length is None:
             # Open-ended read used by the full-download path (_download_blob).
             self.full_downloads += 1
@@ -65,7 +72,9 @@ class _FakeBlobClient:
 
 def _connector() -> CloudConnector:
     # Bypass __init__ (which requires cloud credentials); the methods under test only use self to dispatch.
-    return CloudConnector.__new__(CloudConnector)
+    connector = CloudConnector.__new__(CloudConnector)
+    connector._transfer_concurrency = 1
+    return connector
 
 
 class TestDownloadBlobDelta:
@@ -196,3 +205,51 @@ class TestDownloadFileRouting:
         assert dst.read_bytes() == content
         assert blob.full_downloads == 1
         assert blob.range_requests == []
+
+
+class TestDownloadFileWithRetry:
+    @pytest.mark.unittest
+    def test_retry_after_partial_delta_does_not_duplicate_chunks(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """A chunk failing part way through a delta is retried without writing earlier chunks twice."""
+        monkeypatch.setattr(cc_module, "_DELTA_CHUNK_BYTES", 10)
+        monkeypatch.setattr(cc_module, "sleep", lambda _s: None)
+        content = bytes(range(256)) * 4
+        blob = _FakeBlobClient(content)
+        dst = tmp_path / "f.bin"
+        dst.write_bytes(content[:1000])
+
+        download_blob = blob.download_blob
+        failures = [ServiceRequestError(message="Connection reset")]
+
+        def _fail_second_chunk_once(offset: int = 0, length: int | None = None) -> _FakeDownloadStream:
+            if offset == 1010 and failures:
+                raise failures.pop()
+            return download_blob(offset=offset, length=length)
+
+        monkeypatch.setattr(blob, "download_blob", _fail_second_chunk_once)
+
+        _connector()._download_file_with_retry(blob.as_client, dst, offset=1000, append_only=True)
+
+        assert not failures
+        assert dst.read_bytes() == content
+
+
+class TestDownloadContainerDeltas:
+    @pytest.mark.unittest
+    def test_downloads_every_file(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """More files than the pending-download bound are all downloaded, with their offsets honoured."""
+        monkeypatch.setattr(cc_module, "_MAX_PENDING_DOWNLOADS", 2)
+        blobs = {f"f{i}.csv": _FakeBlobClient(f"header\nrow {i}\n".encode()) for i in range(10)}
+        (tmp_path / "f0.csv").write_bytes(b"header\n")
+        container = SimpleNamespace(get_blob_client=lambda name: blobs[name])
+        connector = _connector()
+        connector._validate_container = lambda _c: container  # type: ignore[method-assign, assignment, return-value]
+
+        offsets = {name: (7 if name == "f0.csv" else 0) for name in blobs}
+        connector.download_container_deltas("expidite-journals", tmp_path, offsets)
+
+        for i in range(10):
+            assert (tmp_path / f"f{i}.csv").read_bytes() == f"header\nrow {i}\n".encode()
+        assert blobs["f0.csv"].range_requests == [(7, 6)]
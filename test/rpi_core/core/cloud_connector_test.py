@@ -1,11 +1,18 @@
 import logging
+import os
 from time import sleep
 
 import pandas as pd
+import pytest
 
 from expidite_rpi.core import api, file_naming
 from expidite_rpi.core import configuration as root_cfg
-from expidite_rpi.core.cloud_connector import AsyncCloudConnector, CloudConnector, LocalCloudConnector
+from expidite_rpi.core.cloud_connector import (
+    AsyncCloudConnector,
+    CloudConnector,
+    LocalCloudConnector,
+    local_cloud_connector,
+)
 
 logger = root_cfg.setup_logger("expidite", level=logging.DEBUG)
 
@@ -84,6 +91,42 @@ class TestCloudConnector:
 
         cc.shutdown()
 
+    def test_local_append_copies_in_kernel(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """LocalCloudConnector.append_to_cloud copies the body with os.copy_file_range, not the fallback."""
+        logger.info("Testing LocalCloudConnector append copy path")
+        cc = CloudConnector.get_instance(root_cfg.CloudType.LOCAL_EMULATOR)
+        assert isinstance(cc, LocalCloudConnector)
+
+        copy_file_range = os.copy_file_range
+        kernel_copies: list[int] = []
+
+        def copy_file_range_spy(src: int, dst: int, count: int, offset_src: int, offset_dst: int) -> int:
+            copied = copy_file_range(src, dst, count, offset_src, offset_dst)
+            kernel_copies.append(copied)
+            return copied
+
+        def copyfileobj_not_expected(*_args: object) -> None:
+            msg = "append_to_cloud fell back to a buffered copy"
+            raise AssertionError(msg)
+
+        monkeypatch.setattr(os, "copy_file_range", copy_file_range_spy)
+        monkeypatch.setattr(local_cloud_connector.shutil, "copyfileobj", copyfileobj_not_expected)
+
+        append_file = file_naming.get_temporary_filename(api.FORMAT.CSV)
+        # Once to create the blob, then again to append to the existing blob.
+        for rows in ("1,3\n2,4\n", "5,7\n"):
+            append_file.write_text("col1,col2\n" + rows)
+            assert cc.append_to_cloud(DST_CONTAINER, append_file, delete_src=False)
+
+        assert sum(kernel_copies) == len("1,3\n2,4\n5,7\n")
+        dl_file = file_naming.get_temporary_filename(api.FORMAT.CSV)
+        cc.download_from_container(DST_CONTAINER, append_file.name, dl_file)
+        assert dl_file.read_text() == "col1,col2\n1,3\n2,4\n5,7\n"
+
+        cc.delete(DST_CONTAINER, append_file.name)
+        append_file.unlink()
+        cc.shutdown()
+
     def set_of_cc_tests(self, cc: CloudConnector) -> None:
         """Standard set of actions that should work on any type of CloudConnector."""
         logger.info("Running standard set of CloudConnector tests")
@@ -9,6 +9,8 @@ https://github.com/Oxford-Bee-Ops/expidite/issues/21.
 """
 
 import logging
+from pathlib import Path
+from types import SimpleNamespace
 from typing import cast
 
 import pytest
@@ -149,14 +151,20 @@ class TestValidateContainerCreateRace:
                 message = "The specified container already exists."  # ...but is by now.
                 raise ResourceExistsError(message)
 
+        class _ServiceClient:
+            def get_container_client(self, container: str) -> ContainerClient:
+                del container  # unused; always the same fake
+                return fake_client
+
         fake_client = cast(ContainerClient, _RaceLosingContainerClient())
         monkeypatch.setattr(
-            cc_module.ContainerClient,
+            cc_module.BlobServiceClient,
             "from_connection_string",
-            lambda **_kwargs: fake_client,
+            lambda _conn_str: _ServiceClient(),
         )
         connector = cc_module.CloudConnector.__new__(cc_module.CloudConnector)
         connector._validated_containers = {}
+        connector._service_client = None
         connector._connection_string = "unused"
 
         with caplog.at_level(logging.WARNING, logger="expidite"):
@@ -224,3 +232,179 @@ class TestAppendDataToBlobEscalation:
         records = _expidite_records(caplog)
         fault = _raise_warn_record(records)
         assert fault.exc_info is None
+
+
+class TestUploadToContainerPartialFailure:
+    @pytest.mark.unittest
+    def test_failed_file_does_not_abort_batch(self, tmp_path: Path) -> None:
+        """One failed upload still lets the rest of the batch land, then the failure is re-raised."""
+        files = [tmp_path / f"file_{i}.bin" for i in range(4)]
+        for file in files:
+            file.write_bytes(b"data")
+
+        class _BlobClient:
+            def __init__(self, name: str) -> None:
+                self.name = name
+
+            def upload_blob(self, data: object, **_kwargs: object) -> None:
+                del data  # unused
+                if self.name == "file_2.bin":
+                    raise ServiceRequestError(message="Failed to resolve blob host")
+
+        class _ContainerClient:
+            def get_blob_client(self, name: str) -> _BlobClient:
+                return _BlobClient(name)
+
+        connector = cc_module.CloudConnector.__new__(cc_module.CloudConnector)
+        connector._upload_workers = 4
+        connector._transfer_concurrency = 1
+        connector._validate_container = lambda _c: _ContainerClient()  # type: ignore[method-assign, assignment, return-value]
+
+        with pytest.raises(ServiceRequestError):
+            connector.upload_to_container("expidite-upload", files, delete_src=True)
+
+        assert [f.name for f in files if f.exists()] == ["file_2.bin"]
+
+
+class TestMoveBetweenContainersCopyTimeout:
+    @pytest.mark.unittest
+    def test_stuck_copy_is_aborted(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """A server-side copy that never leaves "pending" is aborted and its source is not deleted."""
+        monkeypatch.setattr(cc_module, "_COPY_TIMEOUT_SECONDS", 0)
+        monkeypatch.setattr(cc_module, "sleep", lambda _s: None)
+        aborted: list[str] = []
+        deleted: list[str] = []
+
+        class _BlobClient:
+            url = "https://example/src/blob.csv"
+
+            def start_copy_from_url(self, _url: str, **_kwargs: object) -> dict[str, str]:
+                return {"copy_status": "pending", "copy_id": "copy-1"}
+
+            def get_blob_properties(self) -> SimpleNamespace:
+                return SimpleNamespace(copy=SimpleNamespace(status="pending"))
+
+            def abort_copy(self, copy_id: str) -> None:
+                aborted.append(copy_id)
+
+        class _ContainerClient:
+            container_name = "container"
+
+            def get_blob_client(self, _name: str) -> _BlobClient:
+                return _BlobClient()
+
+            def delete_blobs(self, *names: str, **_kwargs: object) -> list[object]:
+                deleted.extend(names)
+                return []
+
+        connector = cc_module.CloudConnector.__new__(cc_module.CloudConnector)
+        connector._validate_container = lambda _c: _ContainerClient()  # type: ignore[method-assign, assignment, return-value]
+
+        with pytest.raises(TimeoutError):
+            connector.move_between_containers("src", "dst", ["blob.csv"], delete_src=True)
+
+        assert aborted == ["copy-1"]
+        assert deleted == []
+
+
+class TestAppendHeaderCache:
+    @pytest.mark.unittest
+    def test_cached_header_skips_remote_check(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """A header validated before a restart is trusted without downloading the head of the blob again."""
+        monkeypatch.setattr(cc_module, "_HEADER_CACHE_FILE", tmp_path / "append_headers.json")
+        appended: list[bytes] = []
+
+        class _BlobClient:
+            blob_name = "V1_HEART_abc.csv"
+
+            def exists(self) -> bool:
+                return True
+
+            def download_blob(self, **_kwargs: object) -> SimpleNamespace:
+                return SimpleNamespace(readall=lambda: b"a,b\n0,0\n")
+
+            def append_block(self, data: bytes) -> None:
+                appended.append(data)
+
+        class _ContainerClient:
+            def get_blob_client(self, name: str) -> _BlobClient:
+                del name  # unused
+                return _BlobClient()
+
+        def _connector() -> cc_module.CloudConnector:
+            connector = cc_module.CloudConnector.__new__(cc_module.CloudConnector)
+            connector._append_locks = {}
+            connector._append_locks_lock = cc_module.Lock()
+            connector._validated_append_files = set()
+            connector._header_cache = connector._load_header_cache()
+            connector._validate_container = lambda _c: _ContainerClient()  # type: ignore[method-assign, assignment, return-value]
+            return connector
+
+        first = _connector()
+        assert first._append_data_to_blob("expidite-upload", "V1_HEART_abc.csv", ["a,b\n", "1,2\n"])
+
+        second = _connector()
+
+        def _no_remote_check(_blob_name: str, _head: str, _header: str) -> bool:
+            msg = "headers should not be re-checked"
+            raise AssertionError(msg)
+
+        second._headers_match = _no_remote_check  # type: ignore[method-assign, assignment]
+        assert second._append_data_to_blob("expidite-upload", "V1_HEART_abc.csv", ["a,b\n", "3,4\n"])
+        assert appended == [b"1,2\n", b"3,4\n"]
+
+    @pytest.mark.unittest
+    def test_merge_caches_merged_header(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """After a header merge rewrites the blob, the cache holds the merged header, not the old one."""
+        monkeypatch.setattr(cc_module, "_HEADER_CACHE_FILE", tmp_path / "append_headers.json")
+        appended: list[bytes] = []
+
+        class _BlobClient:
+            blob_name = "V1_HEART_abc.csv"
+
+            def download_blob(self, **_kwargs: object) -> SimpleNamespace:
+                return SimpleNamespace(readall=lambda: b"a,b\n0,0\n")
+
+            def get_blob_properties(self) -> SimpleNamespace:
+                return SimpleNamespace(size=8)
+
+            def create_append_blob(self) -> None:
+                pass
+
+            def append_block(self, data: bytes) -> None:
+                appended.append(data)
+
+        class _ContainerClient:
+            def get_blob_client(self, name: str) -> _BlobClient:
+                del name  # unused
+                return _BlobClient()
+
+        connector = cc_module.CloudConnector.__new__(cc_module.CloudConnector)
+        connector._append_locks = {}
+        connector._append_locks_lock = cc_module.Lock()
+        connector._validated_append_files = set()
+        connector._header_cache = {"expidite-upload/V1_HEART_abc.csv": "a,b"}
+        connector._validate_container = lambda _c: _ContainerClient()  # type: ignore[method-assign, assignment, return-value]
+        connector._merge_local_and_remote = lambda *_args: "a,b,c\n0,0,\n1,,2\n"  # type: ignore[method-assign]
+
+        assert connector._append_data_to_blob("expidite-upload", "V1_HEART_abc.csv", ["a,c\n", "1,2\n"])
+
+        assert appended == [b"a,b,c\n0,0,\n1,,2\n"]
+        assert connector._load_header_cache() == {"expidite-upload/V1_HEART_abc.csv": "a,b,c"}
+
+    @pytest.mark.unittest
+    def test_cache_keeps_most_recent_entries(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Entries for blobs that are no longer written age out of the persisted cache."""
+        monkeypatch.setattr(cc_module, "_HEADER_CACHE_FILE", tmp_path / "append_headers.json")
+        monkeypatch.setattr(cc_module, "_HEADER_CACHE_MAX_ENTRIES", 2)
+        connector = cc_module.CloudConnector.__new__(cc_module.CloudConnector)
+        connector._append_locks_lock = cc_module.Lock()
+        connector._header_cache = {}
+
+        for day in ("20260101", "20260102", "20260103"):
+            connector._save_header_cache(f"expidite-upload/V1_HEART_{day}.csv", "a,b")
+
+        assert list(connector._load_header_cache()) == [
+            "expidite-upload/V1_HEART_20260102.csv",
+            "expidite-upload/V1_HEART_20260103.csv",
+        ]
@@ -6,6 +6,7 @@ import pytest
 
 from expidite_rpi.core import api, config_validator
 from expidite_rpi.core import configuration as root_cfg
+from expidite_rpi.core.device_config_objects import DeviceCfg, Keys
 from expidite_rpi.example import my_fleet_config
 
 logger = root_cfg.setup_logger("expidite")
@@ -30,6 +31,30 @@ class Test_configuration:
         logger.info("Run test_display_cfg test")
         assert root_cfg.my_device.display() != ""
 
+    @pytest.mark.unittest
+    def test_update_fields(self) -> None:
+        logger.info("Run test_update_fields test")
+        cfg = DeviceCfg(name="before")
+        cfg.update_fields(name="after", cc_upload_pool_size=2)
+        assert cfg.name == "after"
+        assert cfg.cc_upload_pool_size == 2
+        # Names that aren't dataclass fields still go through setattr.
+        cfg.update_fields(name="again", not_a_field=1)
+        assert cfg.name == "again"
+        assert cfg.get_field("not_a_field") == 1
+
+    @pytest.mark.unittest
+    def test_get_storage_account(self) -> None:
+        logger.info("Run test_get_storage_account test")
+        keys = Keys(cloud_storage_key="DefaultEndpointsProtocol=https;AccountName=acct;AccountKey=abc")
+        assert keys.get_storage_account() == "acct"
+        assert keys.get_storage_account() == "acct"
+        # A changed key is re-parsed rather than served from the cached result.
+        keys.cloud_storage_key = "https://other.blob.core.windows.net/?sv=token"
+        assert keys.get_storage_account() == "other"
+        keys.cloud_storage_key = "garbage"
+        assert keys.get_storage_account() == "unknown"
+
     @pytest.mark.unittest
     def test_config_validator(self) -> None:
         logger.info("Run test_config_validator test")
@@ -1,4 +1,7 @@
+import os
+from pathlib import Path
 from types import SimpleNamespace
+from typing import IO
 
 import pytest
 
@@ -60,7 +63,7 @@ class Test_device_manager:
             commands.append(cmd)
             return ""
 
-        monkeypatch.setattr(device_manager, "sleep", lambda _: None)
+        monkeypatch.setattr(manager, "_stop_event", SimpleNamespace(wait=lambda _: False), raising=False)
         monkeypatch.setattr(
             device_manager.utils,
             "run_cmd",
@@ -71,3 +74,68 @@ class Test_device_manager:
 
         assert len(commands) == 1
         assert commands[0] == "sudo nmcli dev wifi connect open-net"
+
+    @pytest.mark.unittest
+    def test_wifi_check_interval_backs_off_while_healthy(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        logger.info("Run test_wifi_check_interval_backs_off_while_healthy test")
+        manager = device_manager.DeviceManager.__new__(device_manager.DeviceManager)
+        manager.ping_check_interval = 10.0
+        manager.wifi_check_interval = 10.0
+        manager.wifi_timer = None
+        manager.current_state = device_manager.DeviceState.BOOTING
+        manager.last_ping_was_ok = False
+        manager.ping_success_count_all = manager.ping_success_count_run = 0
+        manager.ping_failure_count_all = manager.ping_failure_count_run = 0
+        manager.attempt_recovery = True
+        monkeypatch.setattr(manager, "check_wifi_status", lambda: None)
+        monkeypatch.setattr(manager, "attempt_wifi_recovery", lambda: None)
+
+        for _ in range(device_manager.PING_BACKOFF_AFTER_SUCCESSES):
+            manager.action_on_ping_ok()
+        assert manager.wifi_check_interval == manager.ping_check_interval * 2
+
+        for _ in range(device_manager.PING_BACKOFF_AFTER_SUCCESSES * 10):
+            manager.action_on_ping_ok()
+        assert manager.wifi_check_interval == device_manager.MAX_WIFI_CHECK_INTERVAL
+
+        manager.action_on_ping_fail()
+        assert manager.wifi_check_interval == manager.ping_check_interval
+
+    @pytest.mark.unittest
+    def test_set_led_status_skips_unchanged(self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+        logger.info("Run test_set_led_status_skips_unchanged test")
+        led_file = tmp_path / "LED_STATUS"
+        monkeypatch.setattr(device_manager.root_cfg, "LED_STATUS_FILE", led_file)
+        manager = device_manager.DeviceManager.__new__(device_manager.DeviceManager)
+
+        opened: list[str] = []
+
+        def open_spy(file: Path, mode: str = "r") -> IO[str]:
+            opened.append(mode)
+            return open(file, mode)
+
+        monkeypatch.setattr(device_manager, "open", open_spy, raising=False)
+
+        manager.set_led_status("green", "on")
+        assert led_file.read_text() == "green:on\n"
+        assert opened == ["w"]
+
+        # An unchanged status is not rewritten...
+        manager.set_led_status("green", "on")
+        assert opened == ["w"]
+
+        # ...unless something else has changed the file since.
+        led_file.write_text("red:blink:0.25")
+        os.utime(led_file, ns=(0, 0))
+        manager.set_led_status("green", "on")
+        assert led_file.read_text() == "green:on\n"
+        assert opened == ["w", "w"]
+
+        # ...or removed it.
+        led_file.unlink()
+        manager.set_led_status("green", "on")
+        assert led_file.read_text() == "green:on\n"
+
+        manager.set_led_status("red", "on")
+        assert led_file.read_text() == "red:on\n"
+        assert opened == ["w", "w", "w", "w"]
@@ -234,7 +234,7 @@ class TestAsyncCloudConnectorSpool:
         cc._drain_wake.set()
         cc._upload_queue.put(None)
         cc._drain_thread.join(timeout=5)
-        time.sleep(0.2)  # Let do_work consume the sentinel and exit
+        cc._dispatcher_thread.join(timeout=5)
         cc._stop_requested.clear()
 
     def _staged_upload(
@@ -375,6 +375,7 @@ class TestAsyncCloudConnectorSpool:
             item = cc._upload_queue.get_nowait()
             assert isinstance(item, AsyncUpload)
             assert item.src_files[0].exists(), "the file must still exist for the queued retry"
+            assert item.fallbacks == 1
         finally:
             cc.shutdown()
 
@@ -402,6 +403,29 @@ class TestAsyncCloudConnectorSpool:
         finally:
             cc.shutdown()
 
+    @pytest.mark.unittest
+    def test_fallback_backoff_does_not_block_the_dispatcher(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # A backing-off item is held by do_work until it is due; items queued behind it go straight through.
+        cc = self._make_cc(tmp_path)
+        try:
+            monkeypatch.setattr(cc, "_memory_pressure", lambda: True)
+            backing_off = AsyncAppend(CONTAINER, "V3_HEART_d01111111111_20260701.csv", True, CSV_DATA)
+            backing_off.not_before = time.monotonic() + 60
+            cc._upload_queue.put(backing_off)
+            src = make_file(tmp_path, "V3_d01111111111_test.txt")
+            cc.upload_to_container(CONTAINER, [src], delete_src=True)
+
+            deadline = time.monotonic() + 5
+            while not cc._spool.pending_uploads() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert len(cc._spool.pending_uploads()) == 1
+            assert not cc._spool.pending_appends(), "the backing-off append must not be processed yet"
+        finally:
+            cc.shutdown()
+        assert len(cc._spool.pending_appends()) == 1, "shutdown must spool items still backing off"
+
     @pytest.mark.unittest
     def test_drain_uploads_spool_and_returns_online(
         self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
@@ -529,6 +553,80 @@ class TestAsyncCloudConnectorSpool:
         assert len(cc._spool.pending_appends()) == 1
         assert not staging_dir.exists(), "the empty staging dir should be cleaned up"
 
+    @pytest.mark.unittest
+    def test_upload_skips_missing_files_and_removes_staging_dir(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        cc = self._make_cc(tmp_path)
+        self._stop_background_threads(cc)
+        try:
+
+            def fake_upload(
+                self: CloudConnector, dst: str, files: list[Path], delete_src: bool, *a: object
+            ) -> None:
+                for f in files:
+                    f.unlink()
+
+            monkeypatch.setattr(CloudConnector, "upload_to_container", fake_upload)
+
+            src = make_file(tmp_path / "upload", "V3_d01111111111_present.txt")
+            cc.upload_to_container(CONTAINER, [src, tmp_path / "missing.txt"], delete_src=True)
+            assert not src.exists()
+            action = cc._upload_queue.get_nowait()
+            assert isinstance(action, AsyncUpload)
+            assert [f.name for f in action.src_files] == [src.name]
+
+            staging_dir = action.src_files[0].parent
+            cc._async_upload(action)
+            assert not staging_dir.exists()
+        finally:
+            cc.shutdown()
+
+    @pytest.mark.unittest
+    def test_append_without_data_is_not_queued(self, tmp_path: Path) -> None:
+        cc = self._make_cc(tmp_path)
+        self._stop_background_threads(cc)
+        try:
+            assert not cc.append_to_cloud(CONTAINER, tmp_path / "missing.csv", delete_src=True)
+            headers_only = tmp_path / "V3_HEART_d01111111111_20260701.csv"
+            headers_only.write_text("col1,col2\n")
+            assert not cc.append_to_cloud(CONTAINER, headers_only, delete_src=True)
+            assert headers_only.exists()
+            assert cc._upload_queue.empty()
+        finally:
+            cc.shutdown()
+
+    @pytest.mark.unittest
+    def test_queued_appends_to_same_blob_are_coalesced(self, tmp_path: Path) -> None:
+        # Appends that arrive while an earlier append to the same blob is still queued ride along with it.
+        cc = self._make_cc(tmp_path)
+        self._stop_background_threads(cc)
+        try:
+            fname = "V3_HEART_d01111111111_20260701.csv"
+
+            for rows in (["1,2\n"], ["3,4\n"]):
+                src = tmp_path / fname
+                src.write_text("".join(["col1,col2\n", *rows]))
+                assert cc.append_to_cloud(CONTAINER, src, delete_src=True)
+            other = tmp_path / "V3_HEART_d01111111111_20260702.csv"
+            other.write_text("col1,col2\n5,6\n")
+            assert cc.append_to_cloud(CONTAINER, other, delete_src=True)
+
+            queued = [cc._upload_queue.get_nowait() for _ in range(cc._upload_queue.qsize())]
+            appends = [item for item in queued if isinstance(item, AsyncAppend)]
+            assert [a.src_fname for a in appends] == [fname, other.name]
+            assert appends[0].data == ["col1,col2\n", "1,2\n", "3,4\n"]
+
+            # Once taken off the queue, an item accepts no more rows; the next append is queued afresh.
+            cc._claim_queue_item(appends[0])
+            src = tmp_path / fname
+            src.write_text("col1,col2\n7,8\n")
+            assert cc.append_to_cloud(CONTAINER, src, delete_src=True)
+            assert appends[0].data == ["col1,col2\n", "1,2\n", "3,4\n"]
+            assert cc._upload_queue.qsize() == 1
+        finally:
+            cc.shutdown()
+
     @pytest.mark.unittest
     def test_startup_drains_spool_from_previous_run(
         self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
@@ -75,3 +75,21 @@ class Test_datastream:
         logger.info(f"Run test_get_datetime test with fname: {fname} and expected: {expected}")
         dt = file_naming.get_file_datetime(fname)
         assert dt.replace(microsecond=0) == expected
+
+    @pytest.mark.parametrize(
+        "t",
+        ["20250523T172338065", "20250523T172338", "20250523T172338123456", "20240229T235959999"],
+    )
+    @pytest.mark.unittest
+    def test_utc_from_str(self, t: str) -> None:
+        expected = datetime.strptime(t.ljust(api.PADDED_TIME_LEN, "0"), api.STRFTIME).replace(tzinfo=UTC)
+        assert api.utc_from_str(t) == expected
+        assert api.utc_from_str(api.utc_to_fname_str(expected)) == expected.replace(
+            microsecond=expected.microsecond // 1000 * 1000
+        )
+
+    @pytest.mark.parametrize("t", ["20250230T172338065", "2025-05-23T17:23:38", "20250523X172338065"])
+    @pytest.mark.unittest
+    def test_utc_from_str_invalid(self, t: str) -> None:
+        with pytest.raises(ValueError, match=r"."):
+            api.utc_from_str(t)
@@ -67,6 +67,28 @@ class Test_Orchestrator:
             orchestrator.start_all()
             orchestrator.stop_all()
 
+    @pytest.mark.unittest
+    def test_sensor_index_map(self) -> None:
+        root_cfg.update_my_device_id("d01111111111")
+        sc = RpiCore()
+        sc.configure(INVENTORY)
+
+        orchestrator = EdgeOrchestrator.get_instance()
+        orchestrator.reset_orchestrator_state()
+        assert orchestrator.sensor_index_map == {}
+
+        version = orchestrator.config_version
+        orchestrator.load_config()
+        assert orchestrator.config_version > version
+        sensor_map = orchestrator.sensor_index_map
+        for dptree in orchestrator.dp_trees:
+            sensor_cfg = dptree.sensor.config
+            assert sensor_cfg.sensor_index in sensor_map[sensor_cfg.sensor_type.value]
+        # Cached until the config is reloaded or reset.
+        assert orchestrator.sensor_index_map is sensor_map
+        orchestrator.reset_orchestrator_state()
+        assert orchestrator.sensor_index_map == {}
+
     def test_orchestrator_main(self) -> None:
         # We reset cfg.my_device_id to override the computers mac_address.
         # This is a test device defined to have a DummySensor.